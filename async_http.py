@@ -0,0 +1,179 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+import requests
+import metrics
+from http_client import (BACKOFF_MAX, MAX_RETRIES, POST_RETRY_STATUSES, RETRY_STATUSES, TIMEOUT,
+                         backoff_delay, retry_after)
+
+try:
+    import aiohttp
+except ImportError:  # optional: only needed for the asyncio mode
+    aiohttp = None
+
+# Defaults for the asyncio mode: one process keeps this many requests in flight
+MAX_IN_FLIGHT = 1000  # connections across all hosts
+PER_HOST = 100  # requests in flight to any one host
+
+class AsyncResponse:
+    """A finished response; the body is read before the connection goes back to the pool"""
+
+    __slots__ = ('status_code', 'headers', 'content', 'url')
+
+    def __init__(self, status_code, headers, content, url):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.url = url
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+class AsyncTokenBucket:
+    """TokenBucket for coroutines: waits with asyncio.sleep instead of blocking the loop"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+class AsyncHttpClient:
+    """HttpClient for asyncio: one aiohttp session shared by every coroutine
+
+    The connection pool holds up to ``max_in_flight`` connections and a
+    semaphore per host keeps at most ``per_host`` requests open against any
+    one server. Retries, backoff, Retry-After and the optional per-host
+    ``rate_limit`` work as in HttpClient. Create it inside the running loop.
+    """
+
+    def __init__(self, auth=None, per_host=PER_HOST, max_in_flight=MAX_IN_FLIGHT, timeout=TIMEOUT,
+                 max_retries=MAX_RETRIES, rate_limit=None):
+        if aiohttp is None:
+            raise RuntimeError("aiohttp is not installed (pip install aiohttp)")
+        self.per_host = max(1, per_host)
+        self.max_retries = max_retries
+        self.rate_limit = rate_limit
+        self.errors = (aiohttp.ClientError, asyncio.TimeoutError, requests.exceptions.RequestException)
+        self._buckets = {}
+        self._semaphores = {}
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=max_in_flight, limit_per_host=self.per_host),
+            auth=aiohttp.BasicAuth(*auth) if auth and all(auth) else None,
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        )
+
+    def _host_state(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._semaphores:
+            self._buckets[host] = AsyncTokenBucket(self.rate_limit) if self.rate_limit else None
+            self._semaphores[host] = asyncio.Semaphore(self.per_host)
+        return self._buckets[host], self._semaphores[host]
+
+    @staticmethod
+    def _should_retry(method, response, error):
+        if error is None:
+            statuses = POST_RETRY_STATUSES if method.upper() == 'POST' else RETRY_STATUSES
+            return response.status_code in statuses
+        # A POST that reached the server may already have been applied; only a failed connect is safe to resend
+        return method.upper() != 'POST' or isinstance(error, aiohttp.ClientConnectorError)
+
+    async def request(self, method, url, params=None, **kwargs):
+        """Send a request, retrying transient failures
+
+        Returns the final AsyncResponse (which may still be an error status
+        once retries run out) or raises the last connection error.
+        """
+        if params:
+            params = {key: str(value) for key, value in params.items()}
+        bucket, semaphore = self._host_state(url)
+
+        attempt = 0
+        while True:
+            if bucket is not None:
+                await bucket.acquire()
+            response = error = None
+            async with semaphore:
+                started = time.monotonic()
+                try:
+                    async with self.session.request(method, url, params=params, **kwargs) as raw:
+                        response = AsyncResponse(raw.status, raw.headers, await raw.read(), str(raw.url))
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    error = e
+                elapsed = time.monotonic() - started
+            if metrics.enabled:
+                metrics.observe('http_request', elapsed, method=method)
+                metrics.count('http_responses', method=method,
+                              status=response.status_code if response is not None else type(error).__name__)
+
+            if attempt >= self.max_retries or not self._should_retry(method, response, error):
+                if error is not None:
+                    raise error
+                return response
+
+            delay = retry_after(response)
+            if delay is None:
+                delay = backoff_delay(attempt)
+            reason = error if error is not None else f"HTTP {response.status_code}"
+            print(f"🔁 {method} {url} failed ({reason}), retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+            metrics.count('http_retries', method=method)
+            await asyncio.sleep(min(delay, BACKOFF_MAX))
+            attempt += 1
+
+    async def get(self, url, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request('POST', url, **kwargs)
+
+    async def map(self, func, items, limit=None):
+        """Yield ``await func(item)`` for every item as it finishes, in completion order
+
+        ``items`` may be an iterable or an async iterable and is pulled
+        lazily, so at most ``limit`` (default ``per_host``) calls are pending
+        at once however long it is.
+        """
+        limit = limit or self.per_host
+        if not hasattr(items, '__aiter__'):
+            items = _aiter(items)
+        pending = set()
+        async for item in items:
+            pending.add(asyncio.ensure_future(func(item)))
+            if len(pending) >= limit:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+
+    async def close(self):
+        await self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -0,0 +1,255 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import requests
+import junk
+import metrics
+import post
+import serializer
+import test2
+from async_http import AsyncHttpClient
+from category_index import CategoryIndex, slugify
+from http_client import HttpClient
+from parallel_map import map_chunk_in_worker, start_worker
+from progress_journal import ProgressJournal
+from streaming import StreamWriter, close_checkpoints
+
+QUEUE_SIZE = 8  # pages buffered between the crawler and the mappers
+UPLOAD_QUEUE_SIZE = 4 * post.MAX_BATCH_SIZE  # mapped products buffered ahead of the uploader
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+_DONE = object()  # end-of-stream marker put on a queue by its producer
+
+def discover_pages(page_size, rate_limit):
+    """Page count of the catalog, found with a few blocking requests (run in an executor)"""
+    with HttpClient(max_workers=1, rate_limit=rate_limit) as client:
+        return junk.discover_page_count(client, page_size)
+
+async def crawl_pages(client, pages, page_size, rate_limit, failed_pages):
+    """Crawler: put every catalog page's products on ``pages``, as they arrive"""
+    try:
+        loop = asyncio.get_running_loop()
+        try:
+            total_pages = await loop.run_in_executor(None, discover_pages, page_size, rate_limit)
+        except requests.exceptions.RequestException as e:
+            print(f"Request failed: {e}")
+            failed_pages.append(None)
+            return
+        print(f"Streaming {total_pages} pages, up to {client.per_host} requests in flight...")
+
+        async def fetch(page):
+            try:
+                response = await client.get(junk.BASE_URL, params=dict(junk.PARAMS, page=page, elementPerPage=page_size))
+                response.raise_for_status()
+                return page, junk.extract_products(serializer.loads(response.content))
+            except client.errors as e:
+                print(f"Page {page} failed: {e}")
+            except serializer.DecodeError as e:
+                print(f"Page {page} failed: {e}")
+            return page, None
+
+        async for page, products in client.map(fetch, range(total_pages)):
+            if products is None:
+                failed_pages.append(page)
+                continue
+            metrics.count('pages_fetched', outcome='ok')
+            await pages.put(products)
+    finally:
+        await pages.put(_DONE)
+
+async def map_pages(pages, products, executor, outcome, fetched_writer=None, products_writer=None):
+    """Mapper: decode pages in the process pool and put the mapped products on ``products``
+
+    format_description (BeautifulSoup) runs in the pool, never on the event
+    loop. Several mappers share ``pages``; each one passes ``_DONE`` on.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        page = await pages.get()
+        if page is _DONE:
+            await pages.put(_DONE)
+            return
+        if fetched_writer is not None:
+            for product in page:
+                fetched_writer.write(product)
+        try:
+            results, recorded = await loop.run_in_executor(executor, map_chunk_in_worker, test2.decode_product, page)
+        except Exception as e:
+            print(f"❌ Mapping stopped: {str(e)}")
+            outcome['error'] = e
+            continue  # keep taking pages so the crawler never blocks
+        if recorded:
+            metrics.merge(recorded)
+        for record, error in results:
+            if error:
+                print(f"⚠️ Error processing product: {error}")
+                metrics.count('products_mapped', outcome='error')
+                continue
+            mapped = record.to_woocommerce()
+            outcome['mapped'] = outcome.get('mapped', 0) + 1
+            metrics.count('products_mapped', outcome='ok')
+            if products_writer is not None:
+                products_writer.write(mapped)
+            await products.put(mapped)
+
+async def resolve_categories(client, category_index, products):
+    """post.resolve_categories on the async client
+
+    Names the batch could not create are retried one at a time, as
+    post.get_or_create_category would, so preparing needs no request.
+    """
+    missing = category_index.missing(post.category_names(products))
+    if not missing:
+        return
+    print(f"📂 Creating {len(missing)} missing categories...")
+    for start in range(0, len(missing), post.MAX_BATCH_SIZE):
+        names = missing[start:start + post.MAX_BATCH_SIZE]
+        try:
+            response = await client.post(post.CATEGORY_BATCH_URL, headers=JSON_HEADERS,
+                                         data=post.category_batch_body(names))
+        except client.errors as e:
+            print(f"❌ Error creating {len(names)} categories: {str(e)}")
+            continue
+        for category in post.created_categories(names, response):
+            category_index.add(category)
+
+    for name in category_index.missing(missing):
+        try:
+            response = await client.post(post.CATEGORIES_URL, headers=JSON_HEADERS,
+                                         data=serializer.dumps_bytes({"name": name, "slug": slugify(name)}))
+        except client.errors as e:
+            print(f"❌ Error creating category '{name}': {str(e)}")
+            continue
+        category = post.created_category(name, response)
+        if category:
+            category_index.add(category)
+
+async def upload_products(client, products, journal, category_index, batch_size, resume):
+    """Uploader: post products from the queue, keeping many requests in flight
+
+    Categories are resolved for one group of MAX_BATCH_SIZE products at a
+    time; the journal is written on the event loop thread as responses come in.
+    """
+    batch_size = min(batch_size, post.MAX_BATCH_SIZE)
+
+    async def groups():
+        group = []
+        while True:
+            product = await products.get()
+            if product is _DONE:
+                break
+            group.append(product)
+            if len(group) >= post.MAX_BATCH_SIZE:
+                yield group
+                group = []
+        if group:
+            yield group
+
+    async def requests_to_send():
+        position = 1
+        async for group in groups():
+            await resolve_categories(client, category_index, group)
+            # Categories are resolved; one that still failed skips its products rather than block the loop
+            items = list(post.prepare_products(group, category_index, journal, resume, start=position,
+                                               create_missing=False))
+            position += len(group)
+            if batch_size > 0:
+                for packed in post.pack_batches(items, lambda item: serializer.dumps_bytes(item[2]), batch_size):
+                    yield packed
+            else:
+                for item in items:
+                    yield item
+
+    async def post_batch(packed):
+        batch, parts = packed
+        with metrics.timer('post_batch'):
+            try:
+                response = await client.post(post.PRODUCTS_BATCH_URL, headers=JSON_HEADERS,
+                                             data=post.batch_body({"create": parts}))
+            except client.errors as e:
+                print(f"❌ Error posting batch {batch[0][0]}-{batch[-1][0]}: {str(e)}")
+                return [(key, None, str(e)) for _, key, _ in batch]
+        return post.batch_outcomes(batch, response)
+
+    async def post_product(item):
+        i, key, product = item
+        with metrics.timer('post_product'):
+            try:
+                response = await client.post(post.PRODUCTS_URL, headers=JSON_HEADERS,
+                                             data=serializer.dumps_bytes(product))
+            except client.errors as e:
+                print(f"❌ Error posting product {i}: {str(e)}")
+                return [(key, None, str(e))]
+        return post.product_outcome(item, response)
+
+    async for outcomes in client.map(post_batch if batch_size > 0 else post_product, requests_to_send()):
+        post.record_outcomes(journal, outcomes)
+
+async def upload(client, products, journal, category_index, options, outcome):
+    try:
+        await upload_products(client, products, journal, category_index, options.batch_size, options.resume)
+    except Exception as e:
+        print(f"❌ Upload stopped: {str(e)}")
+        outcome['error'] = e
+        while await products.get() is not _DONE:  # keep the mappers from blocking on a full queue
+            pass
+
+async def stream_pipeline_async(options):
+    """pipeline.stream_pipeline on asyncio: crawl, map and upload from one event loop
+
+    The stages are connected by bounded asyncio queues, so a slow uploader
+    holds back mapping and crawling instead of filling memory. Each HTTP
+    client keeps up to ``options.in_flight`` requests open per host.
+    """
+    if options.check_images:
+        print("⚠️ --check-images is not supported in async mode, images are posted unchecked")
+    loop = asyncio.get_running_loop()
+    pages = asyncio.Queue(maxsize=QUEUE_SIZE)
+    products = asyncio.Queue(maxsize=UPLOAD_QUEUE_SIZE)
+    failed_pages = []
+    outcome = {}
+
+    journal = ProgressJournal(post.PROGRESS_JOURNAL_FILE)
+    if not options.resume:
+        journal.reset()
+    category_index = CategoryIndex(await loop.run_in_executor(None, post.fetch_categories))
+    fetched_writer = StreamWriter(options.save_fetched) if options.save_fetched else None
+    products_writer = StreamWriter(options.save_products) if options.save_products else None
+    workers = options.workers or os.cpu_count() or 1
+
+    sooq = AsyncHttpClient(per_host=options.in_flight, rate_limit=options.rate_limit)
+    woo = AsyncHttpClient(auth=(post.WC_CONSUMER_KEY, post.WC_CONSUMER_SECRET), per_host=options.in_flight,
+                          max_retries=post.MAX_RETRIES, rate_limit=post.RATE_LIMIT)
+    try:
+        # Spawned, not forked: the event loop's executor threads are already running
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=start_worker) as executor:
+            crawler = asyncio.create_task(crawl_pages(sooq, pages, options.page_size, options.rate_limit,
+                                                      failed_pages))
+            mappers = [asyncio.create_task(map_pages(pages, products, executor, outcome,
+                                                     fetched_writer, products_writer))
+                       for _ in range(2 * workers)]
+            uploader = asyncio.create_task(upload(woo, products, journal, category_index, options, outcome))
+            try:
+                await crawler
+                await asyncio.gather(*mappers)
+            finally:
+                await products.put(_DONE)
+            await uploader
+    except BaseException as e:
+        outcome['error'] = e
+        raise
+    finally:
+        await sooq.close()
+        await woo.close()
+        close_checkpoints((fetched_writer, products_writer), not failed_pages and 'error' not in outcome)
+        post.close_journal(journal)
+
+    print(f"✅ Mapped {outcome.get('mapped', 0)} products")
+    if failed_pages:
+        print(f"⚠️ {len(failed_pages)} pages failed, rerun with --resume to pick up the rest")
+    return not failed_pages and 'error' not in outcome
+
+def stream_async(options):
+    return asyncio.run(stream_pipeline_async(options))
@@ -0,0 +1,61 @@
+import json
+import random
+
+DEPARTMENTS = ["Electronics", "Home & Garden", "Fashion", "Beauty", "Groceries", "Sports", "Toys", "Books"]
+SECTIONS = ["New Arrivals", "Best Sellers", "Clearance", "Featured"]
+WORDS = ["Premium", "Classic", "Smart", "Wireless", "Organic", "Compact", "Deluxe", "Portable", "Eco", "Pro"]
+NOUNS = ["Blender", "Headphones", "Sneakers", "Backpack", "Lamp", "Kettle", "Watch", "Jacket", "Speaker", "Mug"]
+
+def make_description(rng, i):
+    """Product description HTML shaped like the sooq feed (paragraphs, headings, bullet lists)"""
+    bullets = ''.join(
+        f"<li><strong>{rng.choice(WORDS)}:</strong> {rng.choice(NOUNS).lower()} detail {n}</li>"
+        for n in range(rng.randint(2, 8))
+    )
+    return (
+        f"<p style=\"text-align: justify;\"><strong>About product {i}</strong></p>"
+        f"<p>{' '.join(rng.choice(WORDS).lower() for _ in range(rng.randint(10, 40)))}.</p>"
+        f"<ul>{bullets}</ul>"
+        f"<p>• Warranty: {rng.randint(0, 24)} months&nbsp;&amp; free returns</p>"
+    )
+
+def make_product(rng, i):
+    price = round(rng.uniform(1, 500), 2)
+    return {
+        "publicId": f"bench-{i:07d}",
+        "name": f"{rng.choice(WORDS)} {rng.choice(NOUNS)} {i}",
+        "alias": f"item-{i}",
+        "description": make_description(rng, i),
+        "price": price,
+        "offerPrice": round(price * 0.9, 2) if rng.random() < 0.3 else None,
+        "onOffer": rng.random() < 0.3,
+        "quantity": rng.randint(0, 50),
+        "available": rng.random() < 0.9,
+        "taxable": rng.random() < 0.5,
+        "image_url": f"https://images.example.com/{i % 5000}.jpg",
+        "createdAt": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}T{i % 24:02d}:00:{i % 60:02d}",
+        "departmentResponse": {"name": rng.choice(DEPARTMENTS)},
+        "listingSectionResponse": {"name": rng.choice(SECTIONS)},
+    }
+
+def make_catalog(size, seed=42):
+    """Return ``size`` synthetic sooq products; the same size and seed always give the same catalog"""
+    rng = random.Random(seed)
+    return [make_product(rng, i) for i in range(size)]
+
+def write_snapshot(path, products, chunk_size=10):
+    """Write products as a one-snapshot junk.py store (JSONL)"""
+    chunks = [
+        {"chunk_id": f"chunk_{n // chunk_size + 1:03d}", "products": products[n:n + chunk_size]}
+        for n in range(0, len(products), chunk_size)
+    ]
+    snapshot = {
+        "fetch_time": "2024-01-01T00:00:00",
+        "source_url": "bench",
+        "status_code": 200,
+        "total_products": len(products),
+        "total_chunks": len(chunks),
+        "chunks": chunks,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(snapshot, ensure_ascii=False) + '\n')
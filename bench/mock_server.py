@@ -0,0 +1,192 @@
+"""Local stand-in for the sooq catalog API and the WooCommerce REST API
+
+Serves ``/api/v1/products/all`` with sooq-style pagination and the
+WooCommerce ``products``, ``products/batch``, ``products/categories`` and
+``products/categories/batch`` endpoints under ``/wp-json/wc/v3``. Every
+request can be slowed down by ``latency`` seconds and failed with a 503 at
+``error_rate``, so retries and backoff get exercised too.
+
+    python bench/mock_server.py --size 10000 --latency 0.02 --error-rate 0.01
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from catalog import make_catalog
+
+SOOQ_PATH = "/api/v1/products/all"
+WC_PREFIX = "/wp-json/wc/v3"
+
+class MockState:
+    """Catalog, created WooCommerce objects and request counters shared by all handler threads"""
+
+    def __init__(self, products=(), latency=0.0, error_rate=0.0, seed=0):
+        # Served in createdAt order, like sooq with key=createdAt&direction=asc
+        self.products = sorted(products, key=lambda product: (product.get('createdAt') or '', product.get('publicId') or ''))
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.categories = {}  # id -> category
+        self.created_products = 0
+        self.requests = 0
+        self.errors = 0
+
+    def next_id(self):
+        with self.lock:
+            return next(self.ids)
+
+    def should_fail(self):
+        with self.lock:
+            self.requests += 1
+            if self.error_rate and self.rng.random() < self.error_rate:
+                self.errors += 1
+                return True
+            return False
+
+    def create_category(self, data):
+        """Create a category, or return a term_exists error like WooCommerce does"""
+        name = data.get('name') or ''
+        slug = data.get('slug') or name.lower().replace(' ', '-')
+        with self.lock:
+            for category in self.categories.values():
+                if category['slug'] == slug:
+                    return {"code": "term_exists", "message": "A term with the name provided already exists.",
+                            "data": {"status": 400, "resource_id": category['id']}}
+            category = {"id": next(self.ids), "name": name, "slug": slug}
+            self.categories[category['id']] = category
+            return category
+
+    def create_product(self, data):
+        with self.lock:
+            self.created_products += 1
+            product_id = next(self.ids)
+        images = [{"id": product_id * 10 + n, "src": image.get('src')}
+                  for n, image in enumerate(data.get('images') or [])]
+        return {"id": product_id, "name": data.get('name'), "images": images}
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real servers
+    disable_nagle_algorithm = True
+    wbufsize = -1  # headers and body go out in one write, flushed after each request
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, headers=None, etag=False):
+        payload = json.dumps(body).encode('utf-8')
+        if etag:
+            tag = '"' + hashlib.sha1(payload).hexdigest() + '"'
+            headers = dict(headers or {}, ETag=tag)
+            if self.headers.get('If-None-Match') == tag:
+                self.send_response(304)
+                self.send_header("ETag", tag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(payload)
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def handle_request(self):
+        state = self.server.state
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        data = self.read_json() if self.command in ('POST', 'PUT') else None
+        if state.latency:
+            time.sleep(state.latency)
+        if state.should_fail():
+            self.send_json(503, {"code": "unavailable", "message": "injected failure"}, {"Retry-After": "0"})
+            return
+
+        path = url.path.rstrip('/')
+        if path == SOOQ_PATH:
+            self.sooq_products(state, query)
+        elif path == WC_PREFIX + "/products/categories":
+            if self.command == 'POST':
+                category = state.create_category(data)
+                self.send_json(400 if 'code' in category else 201, category)
+            else:
+                self.list_categories(state, query)
+        elif path == WC_PREFIX + "/products/categories/batch":
+            self.send_json(200, {"create": [state.create_category(item) for item in data.get('create', [])]})
+        elif path == WC_PREFIX + "/products" and self.command == 'POST':
+            self.send_json(201, state.create_product(data))
+        elif path == WC_PREFIX + "/products/batch":
+            self.send_json(200, {
+                "create": [state.create_product(item) for item in data.get('create', [])],
+                "update": [{"id": item.get('id')} for item in data.get('update', [])],
+                "delete": [{"id": product_id} for product_id in data.get('delete', [])],
+            })
+        else:
+            self.send_json(404, {"code": "rest_no_route", "message": "No route was found"})
+
+    def sooq_products(self, state, query):
+        page = int(query.get('page', 0))
+        size = int(query.get('elementPerPage', 20))
+        start = page * size
+        self.send_json(200, {
+            "products": state.products[start:start + size],
+            "totalElements": len(state.products),
+        }, etag=True)
+
+    def list_categories(self, state, query):
+        page = int(query.get('page', 1))
+        per_page = int(query.get('per_page', 10))
+        with state.lock:
+            categories = list(state.categories.values())
+        total_pages = max(1, (len(categories) + per_page - 1) // per_page)
+        start = (page - 1) * per_page
+        self.send_json(200, categories[start:start + per_page], {
+            "X-WP-Total": str(len(categories)),
+            "X-WP-TotalPages": str(total_pages),
+        })
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = handle_request
+
+def start_server(state, host="127.0.0.1", port=0):
+    """Serve ``state`` on a background thread and return the server; port 0 picks a free one"""
+    server = ThreadingHTTPServer((host, port), MockHandler)
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the mock sooq/WooCommerce server")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--size', type=int, default=1000, help="synthetic catalog size")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    state = MockState(make_catalog(args.size), args.latency, args.error_rate)
+    server = start_server(state, port=args.port)
+    host, port = server.server_address
+    print(f"🧪 Mock server on http://{host}:{port}")
+    print(f"   sooq:        http://{host}:{port}{SOOQ_PATH}")
+    print(f"   WooCommerce: http://{host}:{port}{WC_PREFIX}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Throughput benchmarks for the fetch, transform and post stages
+
+Starts the mock server from ``mock_server.py``, points ``junk.py`` and
+``post.py`` at it and runs each stage in a fresh process, so peak RSS is
+per stage. Reports products/sec, p50/p99 request latency and peak RSS.
+
+    python bench/run_bench.py --sizes 1k,10k --latency 0.01 --error-rate 0.01
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path[:0] = [BENCH_DIR, REPO_DIR]
+
+from catalog import make_catalog, write_snapshot
+from mock_server import SOOQ_PATH, WC_PREFIX, MockState, start_server
+
+CATALOG_SIZES = {"1k": 1000, "10k": 10000, "100k": 100000}
+STAGES = ("fetch", "transform", "post")
+
+def percentile(values, pct):
+    """Nearest-rank percentile of ``values`` (None when empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+def time_requests(latencies):
+    """Record the duration of every requests.Session request into ``latencies``"""
+    import requests
+    original = requests.Session.request
+
+    def timed(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    requests.Session.request = timed
+
+def peak_rss_mb():
+    """Peak RSS of this process or any of its finished worker processes (Linux reports KB)"""
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak / 1024 if sys.platform != 'darwin' else peak / (1024 * 1024)
+
+def run_stage(stage, options, results):
+    """Run one stage in this (fresh) process and put its measurements on ``results``"""
+    os.environ.update(options["env"])
+    latencies = []
+    time_requests(latencies)
+    workdir = options["workdir"]
+    products = 0
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        if stage == "fetch":
+            import junk
+            junk.BASE_URL = options["base_url"] + SOOQ_PATH
+            data = junk.crawl_catalog(options["fetch_workers"], options["page_size"],
+                                      os.path.join(workdir, "crawl"))
+            products = len(junk.extract_products(data)) if data else 0
+        elif stage == "transform":
+            import test2
+            test2.SOURCE_FILE = os.path.join(workdir, "snapshot.jsonl")
+            test2.OUTPUT_FILE = os.path.join(workdir, "final.json")
+            test2.process_products(options["transform_workers"])
+            with open(test2.OUTPUT_FILE, 'r', encoding='utf-8') as f:
+                products = len(json.load(f))
+        elif stage == "post":
+            import post
+            post.SOURCE_FILE = os.path.join(workdir, "final.json")
+            post.process_products(options["batch_size"])
+            products = post.ProgressJournal(post.PROGRESS_JOURNAL_FILE).counts().get('done', 0)
+            post.client.close()
+        seconds = time.perf_counter() - start
+    results.put({
+        "stage": stage,
+        "products": products,
+        "seconds": seconds,
+        "products_per_sec": products / seconds if seconds else 0.0,
+        "requests": len(latencies),
+        "p50_ms": percentile(latencies, 50) and percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) and percentile(latencies, 99) * 1000,
+        "peak_rss_mb": peak_rss_mb(),
+    })
+
+def run_in_process(stage, options):
+    """Run ``stage`` in a spawned interpreter so imports and memory don't leak between stages"""
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=run_stage, args=(stage, options, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+def bench_size(label, size, args, server):
+    """Run the selected stages ``args.repeat`` times on a ``size``-product catalog"""
+    catalog = make_catalog(size, args.seed)
+    host, port = server.server_address
+    base_url = f"http://{host}:{port}"
+    report = []
+    for stage in STAGES:
+        if stage not in args.stages and not (stage == "transform" and "post" in args.stages):
+            continue
+        runs = []
+        for _ in range(args.repeat if stage in args.stages else 1):
+            workdir = tempfile.mkdtemp(prefix="wc-bench-")
+            try:
+                write_snapshot(os.path.join(workdir, "snapshot.jsonl"), catalog)
+                server.state = MockState(catalog, args.latency, args.error_rate, args.seed)
+                options = {
+                    "workdir": workdir,
+                    "base_url": base_url,
+                    "fetch_workers": args.fetch_workers,
+                    "page_size": args.page_size,
+                    "transform_workers": args.transform_workers,
+                    "batch_size": args.batch_size,
+                    "env": {
+                        "WC_BASE_URL": base_url + WC_PREFIX,
+                        "WC_CONSUMER_KEY": "ck_bench",
+                        "WC_CONSUMER_SECRET": "cs_bench",
+                        "WC_MAX_WORKERS": str(args.post_workers),
+                        "WC_JOURNAL_FILE": os.path.join(workdir, "journal.sqlite3"),
+                        "DESCRIPTION_FORMATTER": args.formatter,
+                    },
+                }
+                if stage == "post":
+                    run_in_process("transform", options)
+                runs.append(run_in_process(stage, options))
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+        if stage in args.stages:
+            result = sorted(runs, key=lambda run: run["seconds"])[len(runs) // 2]  # median run
+            result.update(catalog=label, runs=len(runs),
+                          seconds_stdev=statistics.stdev(run["seconds"] for run in runs) if len(runs) > 1 else 0.0)
+            report.append(result)
+            print_result(result)
+    return report
+
+def print_result(result):
+    def ms(value):
+        return f"{value:8.1f}" if value is not None else "       -"
+    print(f"{result['catalog']:>5} {result['stage']:<10} {result['products']:>7} products "
+          f"{result['seconds']:8.2f}s {result['products_per_sec']:10.1f}/s "
+          f"p50 {ms(result['p50_ms'])}ms p99 {ms(result['p99_ms'])}ms "
+          f"{result['requests']:>6} req  RSS {result['peak_rss_mb']:7.1f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline against a local mock server")
+    parser.add_argument('--sizes', default="1k,10k", help=f"comma-separated catalogs from {', '.join(CATALOG_SIZES)}")
+    parser.add_argument('--stages', default=",".join(STAGES), help="comma-separated stages to run")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per stage; the median run is reported")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds the mock adds to every request")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests the mock fails with 503")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--fetch-workers', type=int, default=4)
+    parser.add_argument('--page-size', type=int, default=400)
+    parser.add_argument('--transform-workers', type=int, default=1)
+    parser.add_argument('--formatter', choices=["bs4", "fast"], default="bs4")
+    parser.add_argument('--post-workers', type=int, default=8)
+    parser.add_argument('--batch-size', type=int, default=0, help="products/batch size (0 = one POST per product)")
+    parser.add_argument('--json', metavar="PATH", help="also write the results as JSON")
+    args = parser.parse_args()
+    args.stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = [stage for stage in args.stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}")
+
+    server = start_server(MockState())
+    report = []
+    try:
+        for label in args.sizes.split(','):
+            label = label.strip()
+            if label not in CATALOG_SIZES:
+                parser.error(f"unknown catalog size: {label}")
+            report.extend(bench_size(label, CATALOG_SIZES[label], args, server))
+    finally:
+        server.shutdown()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"settings": {key: value for key, value in vars(args).items() if key != 'json'},
+                       "results": report}, f, indent=2)
+        print(f"✅ Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import html
+import re
+
+def normalize_name(name):
+    """Case- and whitespace-insensitive key for a category name
+
+    WooCommerce returns names HTML-escaped (``Home &amp; Garden``), so they are
+    unescaped before comparing with names from the source file.
+    """
+    return re.sub(r'\s+', ' ', html.unescape(name)).strip().lower()
+
+def slugify(name):
+    """Slug used when creating a category"""
+    return name.lower().replace(' ', '-')
+
+class CategoryIndex:
+    """WooCommerce categories keyed by normalized name and by slug"""
+
+    def __init__(self, categories=()):
+        self.by_name = {}
+        self.by_slug = {}
+        for category in categories:
+            self.add(category)
+
+    def add(self, category):
+        self.by_name.setdefault(normalize_name(category['name']), category['id'])
+        if category.get('slug'):
+            self.by_slug.setdefault(category['slug'].lower(), category['id'])
+
+    def get(self, name):
+        """Return the category ID for ``name``, or None if it doesn't exist yet"""
+        if not name:
+            return None
+        category_id = self.by_name.get(normalize_name(name))
+        if category_id is None:
+            category_id = self.by_slug.get(slugify(name.strip()))
+        return category_id
+
+    def missing(self, names):
+        """Return the distinct names (first spelling wins) that aren't indexed yet"""
+        missing = {}
+        for name in names:
+            if name and self.get(name) is None:
+                missing.setdefault(normalize_name(name), name.strip())
+        return list(missing.values())
+
+    def __len__(self):
+        return len(self.by_name)
@@ -0,0 +1,211 @@
+import argparse
+import math
+import os
+from snapshot_store import iter_snapshots
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # optional: only needed for the columnar export and diffs
+    pa = pc = None
+
+EXPORT_DIR = "snapshots_arrow"  # one Arrow IPC file per fetched snapshot
+BATCH_ROWS = 64 * 1024  # products per record batch while exporting
+MIN_COUNT_RATIO = 0.9  # a full snapshot smaller than this share of the last one is suspicious
+DIFF_COLUMNS = ['public_id', 'name', 'price', 'offer_price', 'quantity', 'available']
+
+if pa is not None:
+    SCHEMA = pa.schema([
+        ('public_id', pa.string()),
+        ('name', pa.string()),
+        ('price', pa.float64()),
+        ('offer_price', pa.float64()),
+        ('quantity', pa.int64()),
+        ('available', pa.bool_()),
+        ('on_offer', pa.bool_()),
+        ('created_at', pa.string()),
+        ('department', pa.string()),
+    ])
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed (pip install pyarrow)")
+
+def _number(value):
+    """Price as a float, or None when the feed sent nothing usable"""
+    if value is None or value == "" or isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+def _quantity(value):
+    number = _number(value)
+    return int(number) if number is not None else None
+
+def _text(value):
+    return None if value is None else str(value)
+
+def iter_batches(snapshot, batch_rows=BATCH_ROWS):
+    """Yield the products of one snapshot as record batches of SCHEMA"""
+    columns = {name: [] for name in SCHEMA.names}
+    for chunk in snapshot.get("chunks", []):
+        for product in chunk.get("products", []):
+            if not isinstance(product, dict):
+                continue
+            columns['public_id'].append(_text(product.get("publicId")))
+            columns['name'].append(_text(product.get("name")))
+            columns['price'].append(_number(product.get("price")))
+            columns['offer_price'].append(_number(product.get("offerPrice")))
+            columns['quantity'].append(_quantity(product.get("quantity")))
+            columns['available'].append(bool(product.get("available")))
+            columns['on_offer'].append(bool(product.get("onOffer")))
+            columns['created_at'].append(_text(product.get("createdAt")))
+            columns['department'].append(_text((product.get("departmentResponse") or {}).get("name")))
+            if len(columns['public_id']) >= batch_rows:
+                yield pa.RecordBatch.from_pydict(columns, schema=SCHEMA)
+                columns = {name: [] for name in SCHEMA.names}
+    if columns['public_id']:
+        yield pa.RecordBatch.from_pydict(columns, schema=SCHEMA)
+
+def export_path(snapshot, out_dir=EXPORT_DIR):
+    """File for a snapshot: named by fetch time and mode, so names sort oldest first"""
+    stamp = str(snapshot.get("fetch_time", "")).replace(':', '-')
+    return os.path.join(out_dir, f"{stamp}-{snapshot.get('mode', 'page')}.arrow")
+
+def export_snapshot(snapshot, out_dir=EXPORT_DIR):
+    """Write one snapshot as an uncompressed Arrow IPC file and return its path
+
+    Uncompressed IPC files can be memory-mapped, so reading a column back
+    costs no parsing and no copy. The fetch time, mode and product count go
+    in the schema metadata.
+    """
+    _require_pyarrow()
+    os.makedirs(out_dir, exist_ok=True)
+    path = export_path(snapshot, out_dir)
+    schema = SCHEMA.with_metadata({
+        "fetch_time": str(snapshot.get("fetch_time", "")),
+        "mode": str(snapshot.get("mode", "page")),
+        "total_products": str(snapshot.get("total_products", "")),
+    })
+    tmp_path = path + ".tmp"
+    with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+        for batch in iter_batches(snapshot):
+            writer.write_batch(batch)
+    os.replace(tmp_path, path)
+    return path
+
+def export_store(store_path, out_dir=EXPORT_DIR):
+    """Export every snapshot in a store that has no export yet; return the new paths"""
+    _require_pyarrow()
+    written = []
+    for snapshot in iter_snapshots(store_path):
+        if "chunks" not in snapshot or os.path.exists(export_path(snapshot, out_dir)):
+            continue
+        written.append(export_snapshot(snapshot, out_dir))
+    return written
+
+def read_snapshot(path):
+    """Memory-map an exported snapshot and return it as a pyarrow Table"""
+    _require_pyarrow()
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+def list_exports(out_dir=EXPORT_DIR, mode=None):
+    """Exported snapshot files, oldest first, optionally only those of one mode"""
+    try:
+        names = sorted(name for name in os.listdir(out_dir) if name.endswith('.arrow'))
+    except FileNotFoundError:
+        return []
+    if mode is not None:
+        names = [name for name in names if name.endswith(f"-{mode}.arrow")]
+    return [os.path.join(out_dir, name) for name in names]
+
+def check_count(table, previous, min_ratio=MIN_COUNT_RATIO):
+    """The 90%-of-last-count rule: False when ``table`` lost too many rows against ``previous``"""
+    if previous is None or table.num_rows >= int(min_ratio * previous.num_rows):
+        return True
+    print(f"⚠️ Too few products ({table.num_rows} < {min_ratio:.0%} of last count {previous.num_rows})")
+    return False
+
+def _changed(joined, column):
+    """Rows where ``column`` differs from ``column_old``, counting value <-> null as a change"""
+    new, old = joined[column], joined[column + '_old']
+    differs = pc.fill_null(pc.not_equal(new, old), False)
+    return pc.or_(differs, pc.xor(pc.is_null(new), pc.is_null(old)))
+
+def diff_snapshots(old, new):
+    """Compare two exported snapshots (Tables) in one vectorized pass
+
+    Both sides are joined once on ``public_id``; every report is a filter
+    over that join. Returns a dict of Tables: ``added``, ``removed``,
+    ``price`` (price or offer price changed), ``stock`` (quantity changed)
+    and ``availability``. Changed rows carry ``<column>_old`` next to the new
+    value. Compare full snapshots: a delta snapshot only holds new products,
+    so everything else would show up as removed.
+    """
+    _require_pyarrow()
+    new = new.select(DIFF_COLUMNS).filter(pc.is_valid(new['public_id']))
+    old = old.select(DIFF_COLUMNS).filter(pc.is_valid(old['public_id']))
+    new = new.append_column('_in_new', pc.is_valid(new['public_id']))
+    old = old.append_column('_in_old', pc.is_valid(old['public_id']))
+    old = old.rename_columns(['public_id'] + [name + '_old' for name in DIFF_COLUMNS[1:]] + ['_in_old'])
+    joined = new.join(old, keys='public_id', join_type='full outer')
+
+    in_new = pc.is_valid(joined['_in_new'])
+    in_old = pc.is_valid(joined['_in_old'])
+    both = pc.and_(in_new, in_old)
+    price_changed = pc.or_(_changed(joined, 'price'), _changed(joined, 'offer_price'))
+    return {
+        "added": joined.filter(pc.invert(in_old)).select(DIFF_COLUMNS),
+        "removed": joined.filter(pc.invert(in_new)).select(
+            ['public_id'] + [name + '_old' for name in DIFF_COLUMNS[1:]]),
+        "price": joined.filter(pc.and_(both, price_changed)).select(
+            ['public_id', 'name', 'price_old', 'price', 'offer_price_old', 'offer_price']),
+        "stock": joined.filter(pc.and_(both, _changed(joined, 'quantity'))).select(
+            ['public_id', 'name', 'quantity_old', 'quantity']),
+        "availability": joined.filter(pc.and_(both, _changed(joined, 'available'))).select(
+            ['public_id', 'name', 'available_old', 'available']),
+    }
+
+def print_diff(diff, limit=10):
+    """Print the size of every report and its first ``limit`` rows"""
+    for report, table in diff.items():
+        print(f"{report}: {table.num_rows}")
+        for row in table.slice(0, limit).to_pylist():
+            print(f"   {row}")
+        if table.num_rows > limit:
+            print(f"   ... {table.num_rows - limit} more")
+
+def main():
+    parser = argparse.ArgumentParser(description="Export snapshots to Arrow and diff them")
+    parser.add_argument('--dir', default=EXPORT_DIR, help="directory of exported snapshots")
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help="export every snapshot of a store that isn't exported yet")
+    export.add_argument('store', nargs='?', default="junk15.jsonl", help="snapshot store written by junk.py")
+    diff = commands.add_parser('diff', help="report price, stock and availability changes")
+    diff.add_argument('old', nargs='?', help="older export (default: second newest full snapshot)")
+    diff.add_argument('new', nargs='?', help="newer export (default: newest full snapshot)")
+    diff.add_argument('--limit', type=int, default=10, help="rows shown per report")
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        written = export_store(args.store, args.dir)
+        print(f"✅ Exported {len(written)} snapshots to {args.dir}")
+        return 0
+
+    if args.old is None or args.new is None:
+        exports = list_exports(args.dir, mode='full')
+        if len(exports) < 2:
+            print(f"❌ Need two full snapshots in {args.dir} to diff")
+            return 1
+        args.old, args.new = exports[-2], exports[-1]
+    print(f"🔍 {args.old} → {args.new}")
+    old, new = read_snapshot(args.old), read_snapshot(args.new)
+    check_count(new, old)
+    print_diff(diff_snapshots(old, new), args.limit)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,165 @@
+import hashlib
+import os
+import sqlite3
+import time
+from multiprocessing import util
+
+CACHE_FILE = "description_cache.sqlite3"
+MAX_ENTRIES = 200000  # least recently used descriptions beyond this are evicted
+FLUSH_EVERY = 500     # cache operations between writes (each write is one short transaction)
+
+class DescriptionCache:
+    """SQLite cache of formatted descriptions keyed by a hash of the raw HTML
+
+    Keys include the formatter version, so bumping the version invalidates old
+    entries. Hit/miss counters are kept in the database as well, which lets a
+    run add up the counts of every worker process that used the cache.
+
+    The connection is in autocommit mode: new entries are held in memory and
+    written by ``flush`` in one short transaction, so a worker never holds
+    the write lock while it is formatting or idle. Any SQLite error falls
+    back to formatting without the cache.
+    """
+
+    def __init__(self, path=CACHE_FILE, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._pending = 0
+        self._touched = set()
+        self._new = {}  # key -> text formatted since the last flush
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS descriptions "
+            "(key TEXT PRIMARY KEY, text TEXT NOT NULL, last_used INTEGER NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS descriptions_last_used ON descriptions (last_used)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self.conn.executemany("INSERT OR IGNORE INTO stats VALUES (?, 0)", [("hits",), ("misses",)])
+
+    @staticmethod
+    def key(html_content, version):
+        return hashlib.sha256(f"{version}\0{html_content}".encode('utf-8')).hexdigest()
+
+    def get_or_format(self, html_content, version, formatter):
+        """Return the cached text for ``html_content``, formatting it on a miss"""
+        key = self.key(html_content, version)
+        text = self._new.get(key)
+        if text is None:
+            try:
+                row = self.conn.execute("SELECT text FROM descriptions WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error as e:
+                print(f"⚠️ Description cache unavailable ({e}), formatting without it")
+                return formatter(html_content)
+            if row is not None:
+                self._touched.add(key)
+                text = row[0]
+        if text is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            text = formatter(html_content)
+            self._new[key] = text
+        self._pending += 1
+        if self._pending >= FLUSH_EVERY:
+            self.flush()
+        return text
+
+    def flush(self):
+        """Write new entries, recency updates and this process's counters in one transaction
+
+        On a SQLite error (e.g. the lock wait timing out) the pending writes
+        are dropped; they only cost a re-format later.
+        """
+        if not (self._new or self._touched or self.hits or self.misses):
+            return
+        now = int(time.time())
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO descriptions VALUES (?, ?, ?)",
+                    [(key, text, now) for key, text in self._new.items()]
+                )
+                self.conn.executemany(
+                    "UPDATE descriptions SET last_used = ? WHERE key = ?", [(now, key) for key in self._touched]
+                )
+                self.conn.executemany(
+                    "UPDATE stats SET value = value + ? WHERE name = ?",
+                    [(self.hits, "hits"), (self.misses, "misses")]
+                )
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            print(f"⚠️ Description cache write failed ({e}), {len(self._new)} entries not cached")
+        finally:
+            self.hits = self.misses = self._pending = 0
+            self._touched.clear()
+            self._new.clear()
+
+    def counters(self):
+        """Return the (hits, misses) totals recorded in the database"""
+        self.flush()
+        try:
+            rows = dict(self.conn.execute("SELECT name, value FROM stats"))
+        except sqlite3.Error as e:
+            print(f"⚠️ Description cache unavailable ({e})")
+            rows = {}
+        return rows.get("hits", 0), rows.get("misses", 0)
+
+    def evict(self):
+        """Drop the least recently used entries beyond ``max_entries``"""
+        self.flush()
+        try:
+            count = self.conn.execute("SELECT COUNT(*) FROM descriptions").fetchone()[0]
+            excess = count - self.max_entries
+            if excess > 0:
+                self.conn.execute(
+                    "DELETE FROM descriptions WHERE key IN "
+                    "(SELECT key FROM descriptions ORDER BY last_used LIMIT ?)", (excess,)
+                )
+        except sqlite3.Error as e:
+            print(f"⚠️ Description cache eviction failed ({e})")
+            return 0
+        return max(excess, 0)
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+_caches = {}
+
+def get_cache(path=CACHE_FILE):
+    """Return this process's cache for ``path``, opening it on first use
+
+    Worker processes each open their own connection and flush their counters
+    when the worker exits.
+    """
+    key = (os.getpid(), path)
+    if key not in _caches:
+        cache = DescriptionCache(path)
+        _caches[key] = cache
+        util.Finalize(cache, cache.close, exitpriority=10)
+    return _caches[key]
+
+class RunStats:
+    """Hit/miss summary for one run, covering every process that used the cache"""
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self.start = get_cache(path).counters()
+
+    def summary(self):
+        cache = get_cache(self.path)
+        hits, misses = cache.counters()
+        hits -= self.start[0]
+        misses -= self.start[1]
+        evicted = cache.evict()
+        total = hits + misses
+        rate = 100 * hits / total if total else 0
+        return f"📝 Description cache: {hits} hits, {misses} misses ({rate:.1f}% hit rate), {evicted} evicted"
@@ -0,0 +1,248 @@
+import os
+import re
+import sys
+from html.entities import html5
+from html.parser import HTMLParser
+
+# Tree-building rules of BeautifulSoup's html.parser builder that affect the text
+EMPTY_ELEMENT_TAGS = {
+    'area', 'base', 'basefont', 'bgsound', 'br', 'col', 'command', 'embed', 'frame', 'hr', 'image',
+    'img', 'input', 'isindex', 'keygen', 'link', 'menuitem', 'meta', 'nextid', 'param', 'source',
+    'spacer', 'track', 'wbr'
+}
+PRESERVE_WHITESPACE_TAGS = {'pre', 'textarea'}
+STRING_CONTAINER_TAGS = {'rt', 'rp', 'style', 'script', 'template'}  # their text is left out of get_text()
+ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+
+ENTITY_TO_CHARACTER = {}
+for _name, _character in sorted(html5.items()):
+    ENTITY_TO_CHARACTER.setdefault(_name[:-1] if _name.endswith(';') else _name, _character)
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden", "descriptions")
+
+def _numeric_reference(number):
+    if number == 0 or number > 0x10ffff or 0xd800 <= number <= 0xdfff:
+        return '\ufffd'
+    if 0x80 <= number <= 0x9f:
+        try:
+            return bytes([number]).decode('cp1252')
+        except UnicodeDecodeError:
+            pass
+    return chr(number)
+
+class _Element:
+    """Text collected for one open element
+
+    ``raw`` is its plain get_text(), ``mid`` the text once <p> tags are
+    replaced (what an enclosing <li> sees) and ``final`` the text once <ul>
+    tags are replaced too (what the document sees).
+    """
+    __slots__ = ('name', 'raw', 'mid', 'final', 'has_strong', 'items', 'slot')
+
+    def __init__(self, name):
+        self.name = name
+        self.raw = []
+        self.mid = []
+        self.final = []
+        self.has_strong = False
+        self.items = [] if name == 'ul' else None
+        self.slot = None
+
+class DescriptionParser(HTMLParser):
+    """Single-pass, event-driven equivalent of ``format_description``
+
+    Replays BeautifulSoup's html.parser tree building (entity handling,
+    whitespace-only strings, unmatched end tags, empty-element tags) on a
+    stack of open elements and applies the <p>/<ul>/<li> rewrites as each
+    element closes, so no tree is ever built.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.stack = [_Element('[document]')]
+        self.data = []
+        self.preserve_depth = 0
+        self.container_depth = 0
+        self.already_closed_empty_element = []
+
+    # Strings
+
+    def end_data(self, is_cdata=False):
+        if not self.data:
+            return
+        text = ''.join(self.data)
+        self.data = []
+        if not self.preserve_depth and not text.strip(ASCII_SPACES):
+            text = '\n' if '\n' in text else ' '
+        if self.container_depth and not is_cdata:
+            return
+        top = self.stack[-1]
+        top.raw.append(text)
+        top.mid.append(text)
+        top.final.append(text)
+
+    def handle_data(self, data):
+        self.data.append(data)
+
+    def handle_charref(self, name):
+        base, pattern = 10, r'^([0-9]+)(.*)'
+        if name.startswith(('x', 'X')):
+            name, base, pattern = name[1:], 16, r'^([0-9a-f]+)(.*)'
+        try:
+            self.data.append(_numeric_reference(int(name, base)))
+        except ValueError:
+            match = re.search(pattern, name)
+            if match is None:
+                self.data.append(name)
+            else:
+                self.data.append(_numeric_reference(int(match.group(1), base)))
+                self.data.append(match.group(2))
+
+    def handle_entityref(self, name):
+        self.data.append(ENTITY_TO_CHARACTER.get(name, f"&{name}"))
+
+    def handle_comment(self, data):
+        self.end_data()
+
+    def handle_decl(self, decl):
+        self.end_data()
+
+    def handle_pi(self, data):
+        self.end_data()
+
+    def unknown_decl(self, data):
+        self.end_data()
+        if data.upper().startswith('CDATA['):
+            self.data.append(data[len('CDATA['):])
+            self.end_data(is_cdata=True)
+
+    # Elements
+
+    def handle_starttag(self, tag, attrs, handle_empty_element=True):
+        self.end_data()
+        element = _Element(tag)
+        if tag == 'li':
+            self.reserve_list_item(element)
+        self.stack.append(element)
+        if tag in PRESERVE_WHITESPACE_TAGS:
+            self.preserve_depth += 1
+        if tag in STRING_CONTAINER_TAGS:
+            self.container_depth += 1
+        if tag in EMPTY_ELEMENT_TAGS and handle_empty_element:
+            self.handle_endtag(tag, check_already_closed=False)
+            self.already_closed_empty_element.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs, handle_empty_element=False)
+        self.handle_endtag(tag, check_already_closed=False)
+
+    def handle_endtag(self, tag, check_already_closed=True):
+        if check_already_closed and tag in self.already_closed_empty_element:
+            self.already_closed_empty_element.remove(tag)
+            return
+        self.end_data()
+        for index in range(len(self.stack) - 1, 0, -1):
+            if self.stack[index].name == tag:
+                while len(self.stack) > index:
+                    self.pop_element()
+                break
+
+    def reserve_list_item(self, element):
+        """Keep this <li>'s place in the outermost enclosing <ul>
+
+        ``ul.find_all('li')`` lists items in start-tag order, and items inside
+        a <p> are gone by the time the lists are rewritten.
+        """
+        outermost = None
+        for open_element in self.stack:
+            if open_element.name == 'p':
+                return
+            if open_element.name == 'ul' and outermost is None:
+                outermost = open_element
+        if outermost is not None:
+            element.slot = (outermost, len(outermost.items))
+            outermost.items.append('')
+
+    def pop_element(self):
+        element = self.stack.pop()
+        parent = self.stack[-1]
+        if element.name in PRESERVE_WHITESPACE_TAGS:
+            self.preserve_depth -= 1
+        if element.name in STRING_CONTAINER_TAGS:
+            self.container_depth -= 1
+
+        raw = ''.join(element.raw)
+        parent.raw.append(raw)
+        if element.has_strong or element.name == 'strong':
+            parent.has_strong = True
+
+        if element.name == 'p':
+            text = raw.strip()
+            replacement = f"\n\n{text}\n" if element.has_strong else f"\n\n{text}"
+            parent.mid.append(replacement)
+            parent.final.append(replacement)
+            return
+
+        mid = ''.join(element.mid)
+        parent.mid.append(mid)
+        if element.name == 'ul':
+            parent.final.append('\n' + ''.join(element.items))
+        else:
+            parent.final.append(''.join(element.final))
+        if element.slot is not None:
+            ul, index = element.slot
+            ul.items[index] = f"- {mid.strip()}\n"
+
+    def text(self):
+        self.close()
+        self.end_data()
+        while len(self.stack) > 1:
+            self.pop_element()
+        return ''.join(self.stack[0].final)
+
+def format_description(html_content):
+    """Convert HTML to formatted plain text, byte-identical to the BeautifulSoup path"""
+    if not html_content or not isinstance(html_content, str):
+        return html_content
+
+    parser = DescriptionParser()
+    parser.feed(html_content)
+    text = parser.text()
+
+    # Final cleanup
+    text = re.sub(r'\n{3,}', '\n\n', text)  # Remove excessive newlines
+    text = re.sub(r'([•▪■])\s+', '- ', text)  # Convert bullets to hyphens
+    return text.strip()
+
+def check_golden(golden_dir=GOLDEN_DIR):
+    """Compare both formatter engines with the golden corpus, returning the failure count
+
+    Each ``<case>.html`` in the corpus has a ``<case>.txt`` holding the output
+    of the BeautifulSoup formatter in test2.py (test3.py's renders the same).
+    """
+    engines = [("fast", format_description)]
+    try:
+        import test2
+        import test3
+        engines.append(("test2 bs4", test2.format_description))
+        engines.append(("test3 bs4", test3.format_description))
+    except ImportError:
+        print("⚠️ BeautifulSoup is not installed, checking the fast engine only")
+
+    failures = 0
+    cases = sorted(name[:-len('.html')] for name in os.listdir(golden_dir) if name.endswith('.html'))
+    for case in cases:
+        with open(os.path.join(golden_dir, f"{case}.html"), 'r', encoding='utf-8', newline='') as f:
+            html_content = f.read()
+        with open(os.path.join(golden_dir, f"{case}.txt"), 'r', encoding='utf-8', newline='') as f:
+            expected = f.read()
+        for engine, formatter in engines:
+            if formatter(html_content) != expected:
+                failures += 1
+                print(f"❌ {case}: {engine} output differs from the golden text")
+    print(f"✅ {len(cases) - failures} of {len(cases)} golden cases match" if not failures
+          else f"❌ {failures} golden mismatches in {len(cases)} cases")
+    return failures
+
+if __name__ == "__main__":
+    sys.exit(1 if check_golden() else 0)
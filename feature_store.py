@@ -0,0 +1,177 @@
+import sqlite3
+import time
+import requests
+import metrics
+import serializer
+from http_client import HttpClient
+
+FEATURES_FILE = "features.sqlite3"
+FEATURES_TTL = 24 * 3600  # seconds before a stored entry is revalidated
+FEATURES_WORKERS = 8
+COMMIT_EVERY = 200  # stored responses between commits
+
+class FeatureStore:
+    """Product features keyed by sooq ``publicId``, with HTTP validators
+
+    Replaces the numbered featureN.json files: every product has one row,
+    looked up by ``publicId``, holding the last feature payload and the
+    ``ETag``/``Last-Modified`` it came with so it can be revalidated cheaply.
+    """
+
+    def __init__(self, path=FEATURES_FILE, ttl=FEATURES_TTL):
+        self.ttl = ttl
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS features ("
+            "public_id TEXT PRIMARY KEY, data TEXT NOT NULL, etag TEXT, "
+            "last_modified TEXT, fetched_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def get(self, public_id):
+        """Return the stored features for ``public_id``, or None"""
+        row = self.conn.execute("SELECT data FROM features WHERE public_id = ?", (str(public_id),)).fetchone()
+        return serializer.loads(row[0]) if row else None
+
+    def validators(self, public_id):
+        """Return (etag, last_modified, fetched_at) for a stored entry, or None"""
+        return self.conn.execute(
+            "SELECT etag, last_modified, fetched_at FROM features WHERE public_id = ?", (str(public_id),)
+        ).fetchone()
+
+    def put(self, public_id, data, etag=None, last_modified=None):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO features VALUES (?, ?, ?, ?, ?)",
+            (str(public_id), serializer.dumps(data), etag, last_modified, time.time())
+        )
+
+    def touch(self, public_id):
+        """Mark a stored entry as just revalidated (the server said 304)"""
+        self.conn.execute("UPDATE features SET fetched_at = ? WHERE public_id = ?", (time.time(), str(public_id)))
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM features").fetchone()[0]
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+@metrics.timed('fetch_features')
+def fetch_features(client, url, validators=None):
+    """Conditionally GET one product's features
+
+    Returns ``(status, data, etag, last_modified)`` where status is
+    "fetched", "unchanged" (304) or an error description.
+    """
+    headers = validator_headers(validators)
+    try:
+        response = client.get(url, headers=headers)
+    except requests.exceptions.RequestException as e:
+        return type(e).__name__, None, None, None
+    return features_result(response)
+
+def validator_headers(validators):
+    """Conditional request headers for a stored entry's (etag, last_modified, ...)"""
+    headers = {}
+    if validators:
+        etag, last_modified = validators[0], validators[1]
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+    return headers
+
+def features_result(response):
+    """``(status, data, etag, last_modified)`` for a feature response"""
+    if response.status_code == 304:
+        return "unchanged", None, None, None
+    if response.status_code != 200:
+        return f"HTTP {response.status_code}", None, None, None
+    try:
+        data = serializer.loads(response.content)
+    except serializer.DecodeError:
+        return "invalid JSON", None, None, None
+    return "fetched", data, response.headers.get('ETag'), response.headers.get('Last-Modified')
+
+def stale_features(public_ids, store, counts):
+    """Distinct publicIds with no fresh entry in ``store``, as (publicId, validators) pairs"""
+    pending = []
+    for public_id in dict.fromkeys(str(public_id) for public_id in public_ids if public_id):
+        entry = store.validators(public_id)
+        if entry is not None and time.time() - entry[2] < store.ttl:
+            counts["fresh"] += 1
+        else:
+            pending.append((public_id, entry))
+    return pending
+
+def store_result(store, public_id, result, counts):
+    """Write one ``fetch_features`` result to the store and count it"""
+    status, data, etag, last_modified = result
+    if status == "fetched":
+        store.put(public_id, data, etag, last_modified)
+        counts["fetched"] += 1
+    elif status == "unchanged":
+        store.touch(public_id)
+        counts["unchanged"] += 1
+    else:
+        print(f"⚠️ Failed to fetch features for {public_id}: {status}")
+        counts["failed"] += 1
+    metrics.count('features', outcome=status if status in counts else 'failed')
+
+def fetch_all_features(public_ids, store, url_template, workers=FEATURES_WORKERS):
+    """Fetch features for every distinct publicId that isn't fresh in ``store``
+
+    Requests run on a bounded pool; results are written to the store on the
+    calling thread. Returns a dict of counts per outcome.
+    """
+    counts = {"fresh": 0, "fetched": 0, "unchanged": 0, "failed": 0}
+    pending = stale_features(public_ids, store, counts)
+    if not pending:
+        return counts
+
+    print(f"🔎 Fetching features for {len(pending)} products ({counts['fresh']} cached)...")
+    with HttpClient(max_workers=workers) as client:
+        def fetch(item):
+            public_id, validators = item
+            return public_id, fetch_features(client, url_template.format(public_id), validators)
+
+        for n, (public_id, result) in enumerate(client.map(fetch, pending), start=1):
+            store_result(store, public_id, result, counts)
+            if n % COMMIT_EVERY == 0:
+                store.commit()
+    store.commit()
+    return counts
+
+async def fetch_all_features_async(public_ids, store, url_template, client):
+    """``fetch_all_features`` on an AsyncHttpClient
+
+    Up to the client's in-flight limit of requests run at once, however many
+    products there are. Results are stored on the event loop thread.
+    """
+    counts = {"fresh": 0, "fetched": 0, "unchanged": 0, "failed": 0}
+    pending = stale_features(public_ids, store, counts)
+    if not pending:
+        return counts
+
+    print(f"🔎 Fetching features for {len(pending)} products ({counts['fresh']} cached, async)...")
+
+    async def fetch(item):
+        public_id, validators = item
+        try:
+            response = await client.get(url_template.format(public_id), headers=validator_headers(validators))
+        except client.errors as e:
+            return public_id, (type(e).__name__, None, None, None)
+        return public_id, features_result(response)
+
+    n = 0
+    async for public_id, result in client.map(fetch, pending):
+        n += 1
+        store_result(store, public_id, result, counts)
+        if n % COMMIT_EVERY == 0:
+            store.commit()
+    store.commit()
+    return counts
@@ -0,0 +1,252 @@
+import random
+import threading
+import time
+import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+import metrics
+
+# Defaults shared by the fetcher, processor and importer scripts
+MAX_WORKERS = 8
+POOL_SIZE = 20
+KEEP_ALIVE = True
+TIMEOUT = 30
+
+# Retries: exponential backoff with full jitter, capped, unless Retry-After says otherwise
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5  # seconds
+BACKOFF_MAX = 60    # seconds
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# A POST that reached the server may have been applied, so only retry it when
+# the server says it didn't process the request
+POST_RETRY_STATUSES = {429, 503}
+
+# Adaptive concurrency: halve the in-flight limit when a response takes longer
+# than this multiple of the endpoint's usual latency, or on throttling/server errors
+LATENCY_FACTOR = 3.0
+
+def retry_after(response):
+    """Seconds to wait according to a Retry-After header, or None"""
+    value = response.headers.get('Retry-After') if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def not_sent(error):
+    """True when a requests error was raised before the request reached the server
+
+    Only a connect timeout or a failed new connection (refused, DNS) qualify;
+    "Connection aborted" and the like can come after the body was sent.
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.exceptions.ConnectionError) or not error.args:
+        return False
+    reason = getattr(error.args[0], 'reason', error.args[0])  # MaxRetryError wraps the urllib3 error
+    return isinstance(reason, (ConnectTimeoutError, NewConnectionError))
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Full-jitter exponential backoff for the given (0-based) retry attempt"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+class TokenBucket:
+    """Token bucket allowing ``rate`` requests per second with bursts of ``burst``"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class AdaptiveLimiter:
+    """AIMD limit on in-flight requests
+
+    The limit grows by about one request per window of healthy responses, up
+    to ``max_limit``, and is halved when a response is throttled, fails with a
+    server error or is much slower than the moving average for its endpoint.
+    """
+
+    def __init__(self, max_limit, min_limit=1):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.latency = {}  # endpoint -> moving average of healthy latencies
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, endpoint, latency, overloaded):
+        with self.condition:
+            self.in_flight -= 1
+            average = self.latency.get(endpoint)
+            if not overloaded and average is not None and latency > LATENCY_FACTOR * average:
+                overloaded = True
+            if overloaded:
+                self.limit = max(self.min_limit, self.limit / 2)
+            else:
+                self.latency[endpoint] = latency if average is None else 0.9 * average + 0.1 * latency
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+class HttpClient:
+    """Pooled requests.Session with a bounded worker pool for in-flight calls
+
+    One client keeps its TCP/TLS connections open between calls (unless
+    ``keep_alive`` is off) and ``map`` runs up to ``max_workers`` calls at a
+    time, so a long run is bounded by server capacity instead of serial
+    round trips.
+
+    Every request goes through the same safety layer: retries with jittered
+    exponential backoff (honouring Retry-After) on connection errors, 429 and
+    5xx, an optional per-host token bucket of ``rate_limit`` requests per
+    second, and an adaptive cap on requests in flight.
+    """
+
+    def __init__(self, auth=None, max_workers=MAX_WORKERS, pool_size=POOL_SIZE,
+                 keep_alive=KEEP_ALIVE, timeout=TIMEOUT, max_retries=MAX_RETRIES,
+                 rate_limit=None, adaptive=True):
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.rate_limit = rate_limit
+        self.adaptive = adaptive
+        self._buckets = {}
+        self._limiters = {}
+        self._lock = threading.Lock()
+        self.session = requests.Session()
+        self.session.auth = auth
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=max(pool_size, self.max_workers))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+        self._executor = None
+
+    def _host_state(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._limiters:
+                self._buckets[host] = TokenBucket(self.rate_limit) if self.rate_limit else None
+                self._limiters[host] = AdaptiveLimiter(self.max_workers) if self.adaptive else None
+            return self._buckets[host], self._limiters[host]
+
+    @staticmethod
+    def _should_retry(method, response, error):
+        if error is None:
+            statuses = POST_RETRY_STATUSES if method.upper() == 'POST' else RETRY_STATUSES
+            return response.status_code in statuses
+        # A POST that reached the server may already have been applied, even if the connection then broke
+        return method.upper() != 'POST' or not_sent(error)
+
+    def request(self, method, url, **kwargs):
+        """Send a request, retrying transient failures
+
+        Returns the final response (which may still be an error status once
+        retries run out) or raises the last connection error.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        bucket, limiter = self._host_state(url)
+
+        attempt = 0
+        while True:
+            if bucket is not None:
+                bucket.acquire()
+            if limiter is not None:
+                limiter.acquire()
+            started = time.monotonic()
+            response = error = None
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = e
+            finally:
+                elapsed = time.monotonic() - started
+                if limiter is not None:
+                    overloaded = error is not None or (response is not None and response.status_code in RETRY_STATUSES)
+                    limiter.release(f"{method} {urlsplit(url).path}", elapsed, overloaded)
+                if metrics.enabled:
+                    metrics.observe('http_request', elapsed, method=method)
+                    metrics.count('http_responses', method=method,
+                                  status=response.status_code if response is not None else type(error).__name__)
+
+            if attempt >= self.max_retries or not self._should_retry(method, response, error):
+                if error is not None:
+                    raise error
+                return response
+
+            delay = retry_after(response)
+            if delay is None:
+                delay = backoff_delay(attempt)
+            reason = error if error is not None else f"HTTP {response.status_code}"
+            print(f"🔁 {method} {url} failed ({reason}), retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+            metrics.count('http_retries', method=method)
+            time.sleep(min(delay, BACKOFF_MAX))
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def map(self, func, items):
+        """Yield ``func(item)`` for every item, in order, with bounded concurrency
+
+        Items are pulled lazily, so at most ``2 * max_workers`` calls are
+        queued at once no matter how long ``items`` is.
+        """
+        if self.max_workers == 1:
+            for item in items:
+                yield func(item)
+            return
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        pending = deque()
+        for item in items:
+            pending.append(self._executor.submit(func, item))
+            if len(pending) >= 2 * self.max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,124 @@
+import sqlite3
+import threading
+import time
+import requests
+from http_client import HttpClient
+
+IMAGE_CACHE_FILE = "image_cache.sqlite3"
+CHECK_TTL = 7 * 24 * 3600  # seconds before a URL is checked again
+CHECK_WORKERS = 16
+CHECK_TIMEOUT = 10
+
+def check_image(client, url):
+    """HEAD-check one image URL, returning (ok, status)
+
+    Servers that refuse HEAD get a one-byte ranged GET instead. Only a
+    non-2xx response or a network error marks the image dead; CDNs often
+    send images as application/octet-stream, so another declared type is
+    logged and kept.
+    """
+    try:
+        response = client.request('HEAD', url, allow_redirects=True)
+        if response.status_code in (405, 501):
+            response = client.get(url, headers={'Range': 'bytes=0-0'}, stream=True, allow_redirects=True)
+            response.close()
+    except requests.exceptions.RequestException as e:
+        return False, type(e).__name__
+    status = str(response.status_code)
+    if not 200 <= response.status_code < 300:
+        return False, status
+    content_type = response.headers.get('Content-Type', '')
+    if content_type and not content_type.startswith('image/'):
+        print(f"⚠️ Image {url} is served as {content_type}, keeping it")
+        return True, f"{status} {content_type}"
+    return True, status
+
+class ImageIndex:
+    """Per-URL image check results and uploaded WordPress media IDs
+
+    Loaded into memory at start and written back by ``save``; ``record_media``
+    is safe to call from the importer's worker threads.
+    """
+
+    def __init__(self, path=IMAGE_CACHE_FILE, ttl=CHECK_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS images "
+            "(url TEXT PRIMARY KEY, ok INTEGER, status TEXT, checked_at REAL, media_id INTEGER)"
+        )
+        self.conn.commit()
+        self.images = {
+            url: {"ok": ok, "status": status, "checked_at": checked_at, "media_id": media_id}
+            for url, ok, status, checked_at, media_id in self.conn.execute("SELECT * FROM images")
+        }
+
+    def needs_check(self, url):
+        entry = self.images.get(url)
+        if entry is None:
+            return True
+        if entry["media_id"]:
+            return False
+        return entry["checked_at"] is None or time.time() - entry["checked_at"] > self.ttl
+
+    def set_check(self, url, ok, status):
+        entry = self.images.setdefault(url, {"media_id": None})
+        entry.update(ok=ok, status=status, checked_at=time.time())
+
+    def record_media(self, request_images, response_images):
+        """Remember the media IDs WordPress assigned to sideloaded image URLs"""
+        with self.lock:
+            for sent, created in zip(request_images, response_images or []):
+                if sent.get('src') and created.get('id'):
+                    entry = self.images.setdefault(sent['src'], {"ok": True, "status": None, "checked_at": None})
+                    entry["media_id"] = created['id']
+
+    def rewrite(self, images):
+        """Return ``images`` with known uploads as ``{"id": ...}`` and dead URLs dropped"""
+        rewritten = []
+        with self.lock:
+            for image in images:
+                entry = self.images.get(image.get('src'))
+                if entry is None:
+                    rewritten.append(image)
+                elif entry.get("media_id"):
+                    rewritten.append({"id": entry["media_id"]})
+                elif entry.get("ok") or entry.get("ok") is None:
+                    rewritten.append(image)
+        return rewritten
+
+    def save(self):
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?)",
+                [(url, entry.get("ok"), entry.get("status"), entry.get("checked_at"), entry.get("media_id"))
+                 for url, entry in self.images.items()]
+            )
+            self.conn.commit()
+
+    def close(self):
+        self.save()
+        self.conn.close()
+
+def preflight_images(urls, image_index, workers=CHECK_WORKERS):
+    """Check every distinct image URL not already known, with a bounded pool
+
+    Uses its own client so WooCommerce credentials never go to image hosts.
+    Returns the number of dead URLs found.
+    """
+    pending = [url for url in dict.fromkeys(urls) if url and image_index.needs_check(url)]
+    if not pending:
+        return 0
+    print(f"🖼️ Checking {len(pending)} image URLs...")
+    dead = 0
+    with HttpClient(max_workers=workers, timeout=CHECK_TIMEOUT, max_retries=1) as client:
+        results = client.map(lambda url: (url, check_image(client, url)), pending)
+        for url, (ok, status) in results:
+            image_index.set_check(url, ok, status)
+            if not ok:
+                dead += 1
+                print(f"⚠️ Image unavailable ({status}): {url}")
+    image_index.save()
+    return dead
@@ -1,7 +1,14 @@
 import requests
-import json
+import argparse
 import os
+import shutil
+import time
 from datetime import datetime
+from http_client import HttpClient
+import serializer
+import metrics
+import columnar
+from snapshot_store import append_snapshot
 
 # Configuration
 BASE_URL = "https://api.sooq.africa/api/v1/products/all"
@@ -12,12 +19,26 @@ PARAMS = {
     "direction": "asc"
 }
 CHUNK_SIZE = 10
-OUTPUT_FILE = "junk15.json"
-
-def fetch_products():
+OUTPUT_FILE = "junk15.jsonl"  # one snapshot per line, appended
+
+# Full-catalog crawl
+CRAWL_PAGE_SIZE = 400
+CRAWL_WORKERS = 4
+CRAWL_DIR = "crawl_pages"  # one file per finished page, so a rerun resumes
+RATE_LIMIT = None  # sooq requests per second (None = no limit); retries/backoff come from HttpClient
+
+# Delta fetch
+FETCH_STATE_FILE = "fetch_state.json"  # watermark, catalog size and page validators from the last fetch
+DELTA_PAGE_SIZE = 50  # small pages, so an unchanged tail costs a few kilobytes
+FULL_RECONCILE_EVERY = 24 * 3600  # seconds between full crawls in delta mode (catches edits and deletions)
+EXPORT_DIR = None  # also export each snapshot to Arrow here (see columnar.py)
+
+@metrics.timed('fetch_products')
+def fetch_products(rate_limit=RATE_LIMIT):
     try:
         print(f"Fetching products from {BASE_URL}...")
-        response = requests.get(BASE_URL, params=PARAMS, timeout=30)
+        with HttpClient(max_workers=1, rate_limit=rate_limit) as client:
+            response = client.get(BASE_URL, params=PARAMS, timeout=30)
         response.raise_for_status()
         return {
             "data": response.json(),
@@ -28,6 +49,108 @@ def fetch_products():
         print(f"Request failed: {e}")
         return None
 
+def extract_products(data):
+    """Return the product list from a sooq page payload"""
+    if not data:
+        return []
+    return data.get('products') or (data.get('data') or {}).get('products') or []
+
+def fetch_page(client, page, page_size=CRAWL_PAGE_SIZE):
+    """Fetch one page of the catalog, raising on HTTP errors"""
+    params = dict(PARAMS, page=page, elementPerPage=page_size)
+    response = client.get(BASE_URL, params=params)
+    response.raise_for_status()
+    return response.json()
+
+def discover_page_count(client, page_size=CRAWL_PAGE_SIZE):
+    """Work out how many pages the catalog has.
+
+    Uses the total the API reports when there is one, otherwise probes
+    doubling page numbers until an empty page and bisects back.
+    """
+    first = fetch_page(client, 0, page_size)
+    for source in (first, first.get('data') or {}):
+        if source.get('totalPages') is not None:
+            return int(source['totalPages'])
+        for key in ('totalElements', 'totalProducts', 'total'):
+            if source.get(key) is not None:
+                return (int(source[key]) + page_size - 1) // page_size
+    if not extract_products(first):
+        return 0
+
+    # Last page known to have products, first page known to be empty
+    low, high = 0, 1
+    while extract_products(fetch_page(client, high, page_size)):
+        low, high = high, high * 2
+    while high - low > 1:
+        mid = (low + high) // 2
+        if extract_products(fetch_page(client, mid, page_size)):
+            low = mid
+        else:
+            high = mid
+    return high
+
+def page_file(page, page_size, crawl_dir=CRAWL_DIR):
+    """Checkpoint of one page; the page size is in the name, as page N means other products at another size"""
+    return os.path.join(crawl_dir, f"page_{page:06d}.size{page_size}.json")
+
+def save_page(page, products, page_size, crawl_dir=CRAWL_DIR):
+    """Write a finished page atomically so a crash never leaves half a page"""
+    path = page_file(page, page_size, crawl_dir)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        serializer.dump(products, f, compact=True)
+    os.replace(tmp_path, path)
+
+@metrics.timed('crawl_catalog')
+def crawl_catalog(workers=CRAWL_WORKERS, page_size=CRAWL_PAGE_SIZE, crawl_dir=CRAWL_DIR, rate_limit=RATE_LIMIT):
+    """Fetch every catalog page concurrently and merge them in createdAt order.
+
+    Pages already saved in ``crawl_dir`` by an interrupted run with the
+    same ``page_size`` are skipped.
+    Returns the same shape as ``fetch_products`` or None if any page failed.
+    """
+    os.makedirs(crawl_dir, exist_ok=True)
+    with HttpClient(max_workers=workers, rate_limit=rate_limit) as client:
+        try:
+            total_pages = discover_page_count(client, page_size)
+        except requests.exceptions.RequestException as e:
+            print(f"Request failed: {e}")
+            return None
+
+        missing = [page for page in range(total_pages) if not os.path.exists(page_file(page, page_size, crawl_dir))]
+        print(f"Crawling {total_pages} pages ({total_pages - len(missing)} already done) with {workers} workers...")
+
+        def crawl_page(page):
+            try:
+                products = extract_products(fetch_page(client, page, page_size))
+                save_page(page, products, page_size, crawl_dir)
+                print(f"Fetched page {page + 1}/{total_pages}")
+                metrics.count('pages_fetched', outcome='ok')
+                metrics.count('products_fetched', len(products))
+                return True
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"Page {page} failed: {e}")
+                metrics.count('pages_fetched', outcome='failed')
+                metrics.log('page_failed', page=page, error=str(e))
+                return False
+
+        failed = sum(1 for ok in client.map(crawl_page, missing) if not ok)
+    if failed:
+        print(f"{failed} pages failed, rerun to resume the crawl")
+        return None
+
+    products = []
+    for page in range(total_pages):
+        with open(page_file(page, page_size, crawl_dir), 'r', encoding='utf-8') as f:
+            products.extend(serializer.load(f))
+    products.sort(key=lambda product: product.get('createdAt') or '')
+    return {
+        "data": {"products": products},
+        "url": BASE_URL,
+        "status_code": 200
+    }
+
 def process_products(response_data):
     if not response_data or 'data' not in response_data:
         print("No valid response data")
@@ -63,37 +186,193 @@ def process_products(response_data):
 
 def save_to_file(data):
     try:
-        # Initialize with empty list if file doesn't exist
-        if not os.path.exists(OUTPUT_FILE):
-            with open(OUTPUT_FILE, 'w') as f:
-                json.dump([], f)
-        
-        # Read existing data
-        with open(OUTPUT_FILE, 'r') as f:
-            existing_data = json.load(f)
-        
-        # Append new data
-        existing_data.append(data)
-        
-        # Write back to file
-        with open(OUTPUT_FILE, 'w') as f:
-            json.dump(existing_data, f, indent=2)
+        # Append the snapshot as one line; earlier snapshots are never rewritten
+        append_snapshot(OUTPUT_FILE, data)
             
         print(f"Saved {data['total_products']} products in {data['total_chunks']} chunks to {OUTPUT_FILE}")
         print(f"First chunk has {len(data['chunks'][0]['products'])} products")
         print(f"Last chunk has {len(data['chunks'][-1]['products'])} products")
+        return True
     except Exception as e:
         print(f"Error saving to file: {e}")
+        return False
+
+def export_columns(data, out_dir):
+    """Export a saved snapshot to Arrow; full snapshots are count-checked against the last full one"""
+    try:
+        previous = columnar.list_exports(out_dir, mode='full')
+        path = columnar.export_snapshot(data, out_dir)
+        print(f"📦 Exported columns to {path}")
+        if data['mode'] == 'full' and previous:
+            columnar.check_count(columnar.read_snapshot(path), columnar.read_snapshot(previous[-1]))
+    except Exception as e:
+        print(f"❌ Error exporting snapshot: {e}")
+
+def watermark_of(product):
+    """Position of a product in the createdAt-ordered catalog (publicId breaks ties)"""
+    return [product.get('createdAt') or '', str(product.get('publicId') or '')]
+
+def load_fetch_state(path=FETCH_STATE_FILE):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return serializer.load(f)
+    except FileNotFoundError:
+        return None
+
+def save_fetch_state(state, path=FETCH_STATE_FILE):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        serializer.dump(state, f)
+    os.replace(tmp_path, path)
+
+def full_fetch_state(products):
+    """State after a full crawl: the newest product is the watermark"""
+    watermark = max((watermark_of(product) for product in products), default=['', ''])
+    return {"watermark": watermark, "total": len(products), "full_at": time.time(), "page_size": None, "pages": {}}
+
+def fetch_page_conditional(client, page, page_size, validators=None):
+    """Fetch one page unless it is unchanged since ``validators`` were stored
+
+    Returns ``(products or None when unchanged, validators)``.
+    """
+    headers = {}
+    if validators:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+    params = dict(PARAMS, page=page, elementPerPage=page_size)
+    response = client.get(BASE_URL, params=params, headers=headers)
+    if response.status_code == 304:
+        return None, validators
+    response.raise_for_status()
+    products = extract_products(serializer.loads(response.content))
+    return products, {
+        "etag": response.headers.get('ETag'),
+        "last_modified": response.headers.get('Last-Modified'),
+        "count": len(products),
+    }
+
+@metrics.timed('fetch_delta')
+def fetch_delta(state, page_size=DELTA_PAGE_SIZE, rate_limit=RATE_LIMIT):
+    """Fetch only the products created after the watermark in ``state``
+
+    Starts at the page the previous catalog ended on and pages forward. If
+    deletions moved new products onto earlier pages (the start page is
+    empty or begins past the watermark) it steps back a page at a time.
+    Unchanged pages answer 304. Returns ``(new products, updated state)``;
+    raises on request errors so the state is never advanced past a gap.
+    """
+    watermark = state['watermark']
+    validators = state['pages'] if state.get('page_size') == page_size else {}
+    page = state['total'] // page_size
+    new_products = []
+    located = False  # found the page holding the watermark
+    with HttpClient(max_workers=1, rate_limit=rate_limit) as client:
+        while True:
+            products, page_validators = fetch_page_conditional(client, page, page_size, validators.get(str(page)))
+            if products is None:
+                count = page_validators.get('count', page_size)
+                metrics.count('delta_pages', outcome='unchanged')
+            else:
+                count = len(products)
+                metrics.count('delta_pages', outcome='fetched')
+                if page > 0 and not located and (not products or watermark_of(products[0]) > watermark):
+                    page -= 1
+                    continue
+                new_products.extend(product for product in products if watermark_of(product) > watermark)
+            validators[str(page)] = page_validators
+            located = True
+            if count < page_size:
+                break
+            page += 1
+
+    total = page * page_size + count
+    new_state = {
+        "watermark": max([watermark] + [watermark_of(product) for product in new_products]),
+        "total": total,
+        "full_at": state['full_at'],
+        "page_size": page_size,
+        # Pages before the last one can't change without a deletion, which the full reconcile handles
+        "pages": {key: value for key, value in validators.items() if int(key) >= page - 1},
+    }
+    return new_products, new_state
+
+def fetch_snapshot(crawl=False, workers=CRAWL_WORKERS, page_size=CRAWL_PAGE_SIZE, rate_limit=RATE_LIMIT,
+                   delta=False):
+    """Fetch the catalog and append it to OUTPUT_FILE
+
+    Fetches one page, or every page with ``crawl``. With ``delta`` only the
+    products added since the last fetch are fetched, falling back to a full
+    crawl when there is no state yet or the last one is older than
+    FULL_RECONCILE_EVERY. Snapshots are tagged with the mode that made them.
+    """
+    state = None
+    mode = "full" if crawl else "page"
+    if delta:
+        state = load_fetch_state()
+        if state is None or time.time() - state.get('full_at', 0) > FULL_RECONCILE_EVERY:
+            print("🔄 Full reconcile of the catalog...")
+            crawl, mode = True, "full"
+        else:
+            mode = "delta"
+
+    if mode == "delta":
+        try:
+            new_products, state = fetch_delta(state, rate_limit=rate_limit)
+        except requests.exceptions.RequestException as e:
+            print(f"Request failed: {e}")
+            return False
+        if not new_products:
+            save_fetch_state(state)
+            print(f"💤 No new products since the last fetch ({state['total']} in the catalog)")
+            return True
+        print(f"🆕 {len(new_products)} new products since the last fetch")
+        response = {"data": {"products": new_products}, "url": BASE_URL, "status_code": 200}
+    elif crawl:
+        response = crawl_catalog(workers, page_size, rate_limit=rate_limit)
+    else:
+        response = fetch_products(rate_limit)
+    if not response:
+        return False
+    processed_data = process_products(response)
+    if not processed_data:
+        return False
+    processed_data["mode"] = mode
+    metrics.log('fetch_finished', mode=mode, products=processed_data['total_products'],
+                chunks=processed_data['total_chunks'])
+    if not save_to_file(processed_data):
+        return False
+    if EXPORT_DIR:
+        export_columns(processed_data, EXPORT_DIR)
+    if crawl:
+        shutil.rmtree(CRAWL_DIR, ignore_errors=True)
+        state = full_fetch_state(extract_products(response))
+    if state is not None:
+        save_fetch_state(state)
+    return True
 
 def main():
+    global EXPORT_DIR
+    parser = argparse.ArgumentParser(description="Fetch sooq products into a snapshot file")
+    parser.add_argument('--crawl', action='store_true', help="fetch every catalog page instead of one page")
+    parser.add_argument('--workers', type=int, default=CRAWL_WORKERS, help="pages fetched in parallel")
+    parser.add_argument('--page-size', type=int, default=CRAWL_PAGE_SIZE, help="products per page")
+    parser.add_argument('--rate-limit', type=float, default=RATE_LIMIT, help="max sooq requests per second")
+    parser.add_argument('--delta', action='store_true',
+                        help="fetch only products added since the last fetch (full crawl once a day)")
+    parser.add_argument('--export', nargs='?', const=columnar.EXPORT_DIR, default=EXPORT_DIR, metavar='DIR',
+                        help="also export the snapshot to an Arrow file for columnar diffs")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure_from_args(args)
+    EXPORT_DIR = args.export
+
     print("Junk Format Product Fetcher")
     print("--------------------------")
     
-    response = fetch_products()
-    if response:
-        processed_data = process_products(response)
-        if processed_data:
-            save_to_file(processed_data)
+    fetch_snapshot(args.crawl, args.workers, args.page_size, args.rate_limit, args.delta)
+    metrics.finish('fetch')
 
 if __name__ == "__main__":
     main()
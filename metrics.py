@@ -0,0 +1,203 @@
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from functools import wraps
+
+METRICS_FILE = os.getenv('PIPELINE_METRICS_FILE')  # *.prom = Prometheus textfile, anything else JSON
+LOG_FORMAT = os.getenv('PIPELINE_LOG_FORMAT', 'text')  # "json" = one JSON event per line on stderr
+PROFILE_FILE = os.getenv('PIPELINE_PROFILE')  # cProfile stats written here at the end of the run
+METRIC_PREFIX = "pipeline"
+
+# Checked before any bookkeeping, so instrumented code costs one global lookup when off
+enabled = bool(METRICS_FILE) or LOG_FORMAT == 'json'
+
+_lock = threading.Lock()
+_timers = {}  # (name, labels) -> [count, total seconds, max seconds]
+_counters = {}  # (name, labels) -> value
+_profiler = None
+
+def _key(name, labels):
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def configure(metrics_file=None, log_json=False, profile_file=None):
+    """Turn the layer on for this run (and for worker processes started after it)"""
+    global METRICS_FILE, LOG_FORMAT, PROFILE_FILE, enabled, _profiler
+    if metrics_file:
+        METRICS_FILE = os.environ['PIPELINE_METRICS_FILE'] = metrics_file
+    if log_json:
+        LOG_FORMAT = os.environ['PIPELINE_LOG_FORMAT'] = 'json'
+    enabled = bool(METRICS_FILE) or LOG_FORMAT == 'json'
+    if profile_file and _profiler is None:
+        PROFILE_FILE = profile_file
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+def add_arguments(parser):
+    """Add the --metrics, --log-json and --profile flags to a script's parser"""
+    parser.add_argument('--metrics', metavar='PATH', default=METRICS_FILE,
+                        help="write run metrics here at the end (.prom for Prometheus textfile, else JSON)")
+    parser.add_argument('--log-json', action='store_true', default=LOG_FORMAT == 'json',
+                        help="emit structured JSON events on stderr")
+    parser.add_argument('--profile', metavar='PATH', default=PROFILE_FILE,
+                        help="run under cProfile and write the stats here")
+
+def configure_from_args(args):
+    configure(args.metrics, args.log_json, args.profile)
+
+def observe(name, seconds, **labels):
+    """Record one duration for timer ``name``"""
+    key = _key(name, labels)
+    with _lock:
+        timer = _timers.get(key)
+        if timer is None:
+            _timers[key] = [1, seconds, seconds]
+        else:
+            timer[0] += 1
+            timer[1] += seconds
+            if seconds > timer[2]:
+                timer[2] = seconds
+
+def count(name, value=1, **labels):
+    """Add ``value`` to counter ``name``"""
+    if not enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+class timer:
+    """Context manager timing its block into timer ``name``"""
+
+    def __init__(self, name, **labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter() if enabled else None
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is not None:
+            observe(self.name, time.perf_counter() - self.start, **self.labels)
+
+def timed(name, **labels):
+    """Decorator timing every call of the function into timer ``name``"""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - start, **labels)
+        return wrapper
+    return decorate
+
+def log(event, **fields):
+    """Write a structured event line when JSON logging is on"""
+    if LOG_FORMAT != 'json':
+        return
+    record = {"ts": datetime.now().isoformat(), "event": event, "pid": os.getpid()}
+    record.update(fields)
+    sys.stderr.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+def drain():
+    """Return and clear everything recorded so far, for shipping out of a worker process"""
+    with _lock:
+        recorded = {"timers": list(_timers.items()), "counters": list(_counters.items())}
+        _timers.clear()
+        _counters.clear()
+    return recorded
+
+def merge(recorded):
+    """Add what ``drain`` returned in another process to this process's metrics"""
+    with _lock:
+        for key, (calls, total, longest) in recorded["timers"]:
+            timer = _timers.setdefault(key, [0, 0.0, 0.0])
+            timer[0] += calls
+            timer[1] += total
+            timer[2] = max(timer[2], longest)
+        for key, value in recorded["counters"]:
+            _counters[key] = _counters.get(key, 0) + value
+
+def snapshot():
+    """Return the current metrics as a JSON-ready dict"""
+    with _lock:
+        timers = [
+            {"name": name, "labels": dict(labels), "count": calls, "sum": total,
+             "mean": total / calls if calls else 0.0, "max": longest}
+            for (name, labels), (calls, total, longest) in sorted(_timers.items())
+        ]
+        counters = [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in sorted(_counters.items())
+        ]
+    return {"timers": timers, "counters": counters}
+
+def _prometheus_labels(labels):
+    if not labels:
+        return ""
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+def prometheus_text(data):
+    """Render a ``snapshot`` in the Prometheus text exposition format"""
+    lines = []
+    typed = set()
+    for entry in data["timers"]:
+        metric = f"{METRIC_PREFIX}_{entry['name']}_seconds"
+        if metric not in typed:
+            typed.add(metric)
+            lines.append(f"# TYPE {metric} summary")
+        labels = _prometheus_labels(entry["labels"])
+        lines.append(f"{metric}_count{labels} {entry['count']}")
+        lines.append(f"{metric}_sum{labels} {entry['sum']:.6f}")
+    for entry in data["timers"]:
+        metric = f"{METRIC_PREFIX}_{entry['name']}_seconds_max"
+        if metric not in typed:
+            typed.add(metric)
+            lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric}{_prometheus_labels(entry['labels'])} {entry['max']:.6f}")
+    for entry in data["counters"]:
+        metric = f"{METRIC_PREFIX}_{entry['name']}_total"
+        if metric not in typed:
+            typed.add(metric)
+            lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric}{_prometheus_labels(entry['labels'])} {entry['value']}")
+    return "\n".join(lines) + "\n"
+
+def write_metrics(path):
+    """Write the metrics atomically, so a textfile collector never reads half a file"""
+    data = snapshot()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        if path.endswith('.prom'):
+            f.write(prometheus_text(data))
+        else:
+            json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+def finish(run):
+    """End of run: stop the profiler and write the metrics dump and a summary event"""
+    global _profiler
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler.dump_stats(PROFILE_FILE)
+        _profiler = None
+        print(f"🔬 Profile written to {PROFILE_FILE}")
+    if not enabled:
+        return
+    data = snapshot()
+    log("run_finished", run=run, **data)
+    if METRICS_FILE:
+        try:
+            write_metrics(METRICS_FILE)
+            print(f"📈 Metrics written to {METRICS_FILE}")
+        except OSError as e:
+            print(f"❌ Error writing metrics to {METRICS_FILE}: {str(e)}")
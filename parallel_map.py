@@ -0,0 +1,66 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import metrics
+
+CHUNK_SIZE = 200  # products sent to a worker process at a time
+
+def _map_chunk(func, chunk):
+    """Run ``func`` over one chunk inside a worker, capturing per-item errors"""
+    results = []
+    for item in chunk:
+        try:
+            results.append((func(item), None))
+        except Exception as e:
+            results.append((None, str(e)))
+    return results
+
+def map_chunk_in_worker(func, chunk):
+    """``_map_chunk`` plus the metrics the worker recorded for it, to merge into the parent"""
+    results = _map_chunk(func, chunk)
+    return results, metrics.drain() if metrics.enabled else None
+
+def start_worker():
+    """Pool initializer: drop the metrics a forked worker inherited, or ``drain`` would count them again"""
+    metrics.drain()
+
+def _collect(future):
+    results, recorded = future.result()
+    if recorded:
+        metrics.merge(recorded)
+    return results
+
+def _chunks(items, size):
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+def map_products(func, products, workers=1, chunk_size=CHUNK_SIZE, mp_context=None):
+    """Yield ``(result, error)`` for every product, in input order
+
+    With ``workers`` > 1 the products are split into chunks of ``chunk_size``
+    and mapped across a process pool; at most ``2 * workers`` chunks are
+    pending at once, so streamed input stays streamed. ``workers=0`` uses one
+    process per CPU. ``func`` must be a module-level (picklable) function.
+    Callers that already run threads should pass a spawn ``mp_context``: a
+    fork taken while another thread holds a lock can deadlock the workers.
+    """
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        for chunk in _chunks(products, chunk_size):
+            yield from _map_chunk(func, chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context, initializer=start_worker) as executor:
+        pending = deque()
+        for chunk in _chunks(products, chunk_size):
+            pending.append(executor.submit(map_chunk_in_worker, func, chunk))
+            if len(pending) >= 2 * workers:
+                yield from _collect(pending.popleft())
+        while pending:
+            yield from _collect(pending.popleft())
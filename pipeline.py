@@ -0,0 +1,268 @@
+import argparse
+import multiprocessing
+import os
+import queue
+import threading
+import requests
+import async_http
+import async_pipeline
+import columnar
+import junk
+import metrics
+import post
+import serializer
+import shard_import
+import test2
+from description_cache import CACHE_FILE, RunStats
+from http_client import HttpClient
+from parallel_map import CHUNK_SIZE, map_products
+from streaming import StreamWriter, close_checkpoints
+
+QUEUE_SIZE = 8  # pages buffered between the crawler and the mapper
+UPLOAD_QUEUE_SIZE = 4 * post.MAX_BATCH_SIZE  # mapped products buffered ahead of the uploader
+
+_DONE = object()  # end-of-stream marker put on a queue by its producer
+
+def drain(q):
+    """Yield items from ``q`` until its producer puts ``_DONE``"""
+    while True:
+        item = q.get()
+        if item is _DONE:
+            return
+        yield item
+
+def crawl_pages(pages, workers, page_size, rate_limit, failed_pages):
+    """Crawler thread: put every catalog page's products on ``pages``, in page order"""
+    try:
+        with HttpClient(max_workers=workers, rate_limit=rate_limit) as client:
+            total_pages = junk.discover_page_count(client, page_size)
+            print(f"Streaming {total_pages} pages with {workers} workers...")
+
+            def fetch(page):
+                try:
+                    return page, junk.extract_products(junk.fetch_page(client, page, page_size))
+                except (requests.exceptions.RequestException, ValueError) as e:
+                    print(f"Page {page} failed: {e}")
+                    return page, None
+
+            for page, products in client.map(fetch, range(total_pages)):
+                if products is None:
+                    failed_pages.append(page)
+                    continue
+                metrics.count('pages_fetched', outcome='ok')
+                pages.put(products)
+    except requests.exceptions.RequestException as e:
+        print(f"Request failed: {e}")
+        failed_pages.append(None)
+    finally:
+        pages.put(_DONE)
+
+def upload_products(products, options, outcome):
+    """Uploader thread: post products from the queue as they are mapped"""
+    try:
+        outcome['counts'] = post.push_products(drain(products), options.batch_size, options.resume,
+                                               options.check_images)
+    except Exception as e:
+        print(f"❌ Upload stopped: {str(e)}")
+        outcome['error'] = e
+        for _ in drain(products):  # keep the mapper from blocking on a full queue
+            pass
+
+def stream_pipeline(options):
+    """Fetch, map and upload in one pass, connected by bounded queues
+
+    The crawler thread feeds pages to the mapper (this thread, fanning out to
+    ``options.workers`` processes), which feeds the uploader thread, so the
+    first products are posted while later pages are still being fetched.
+    ``--save-fetched`` and ``--save-products`` keep optional checkpoints of
+    the raw and mapped products.
+    """
+    pages = queue.Queue(maxsize=QUEUE_SIZE)
+    products = queue.Queue(maxsize=UPLOAD_QUEUE_SIZE)
+    failed_pages = []
+    outcome = {}
+    crawler = threading.Thread(
+        target=crawl_pages,
+        args=(pages, options.fetch_workers, options.page_size, options.rate_limit, failed_pages),
+        daemon=True
+    )
+    uploader = threading.Thread(target=upload_products, args=(products, options, outcome), daemon=True)
+    crawler.start()
+    uploader.start()
+
+    fetched_writer = StreamWriter(options.save_fetched) if options.save_fetched else None
+    products_writer = StreamWriter(options.save_products) if options.save_products else None
+
+    def source_products():
+        for page in drain(pages):
+            for product in page:
+                if fetched_writer is not None:
+                    fetched_writer.write(product)
+                yield product
+
+    mapped_count = 0
+    try:
+        # Spawned, not forked: the crawler and uploader threads are already running
+        for record, error in map_products(test2.decode_product, source_products(), options.workers,
+                                          options.chunk_size, multiprocessing.get_context('spawn')):
+            if error:
+                print(f"⚠️ Error processing product: {error}")
+                metrics.count('products_mapped', outcome='error')
+                continue
+            mapped = record.to_woocommerce()
+            mapped_count += 1
+            metrics.count('products_mapped', outcome='ok')
+            if products_writer is not None:
+                products_writer.write(mapped)
+            products.put(mapped)
+    except Exception as e:
+        print(f"❌ Mapping stopped: {str(e)}")
+        outcome['error'] = e
+        for _ in drain(pages):  # let the crawler finish instead of blocking
+            pass
+    finally:
+        products.put(_DONE)
+    crawler.join()
+    uploader.join()
+
+    ok = not failed_pages and 'error' not in outcome
+    close_checkpoints((fetched_writer, products_writer), ok)
+    print(f"✅ Mapped {mapped_count} products")
+    if failed_pages:
+        print(f"⚠️ {len(failed_pages)} pages failed, rerun with --resume to pick up the rest")
+    return ok
+
+def set_description_options(options):
+    """Pass --formatter/--cache to test2 (and its worker processes) through the environment"""
+    os.environ['DESCRIPTION_FORMATTER'] = options.formatter
+    serializer.COMPACT = options.compact
+    if options.cache:
+        os.environ['DESCRIPTION_CACHE_FILE'] = options.cache
+        return RunStats(options.cache)
+    return None
+
+def run_fetch(options):
+    junk.OUTPUT_FILE = options.output
+    junk.EXPORT_DIR = options.export
+    return junk.fetch_snapshot(options.crawl, options.fetch_workers, options.page_size, options.rate_limit,
+                               options.delta)
+
+def run_transform(options):
+    test2.SOURCE_FILE = options.input
+    test2.OUTPUT_FILE = options.output
+    cache_stats = set_description_options(options)
+    ok = test2.process_products_stream(options.workers, options.chunk_size, not options.no_dedup)
+    if cache_stats is not None:
+        print(cache_stats.summary())
+    return ok
+
+def run_push(options):
+    post.SOURCE_FILE = options.input
+    if options.shards > 1:
+        shard_import.REPORT_FILE = options.report
+        return shard_import.report_ok(shard_import.import_sharded(options.shards, options.batch_size,
+                                                                  options.resume, options.check_images))
+    counts = post.process_products(options.batch_size, options.resume, options.check_images)
+    return not counts.get('failed') and not counts.get('pending')
+
+def run_sync(options):
+    post.SOURCE_FILE = options.input
+    counts = post.sync_products(options.delete_missing, options.batch_size, options.check_images)
+    return not counts['failed']
+
+def run_stream(options):
+    cache_stats = set_description_options(options)
+    if options.use_async:
+        ok = async_pipeline.stream_async(options)
+    else:
+        ok = stream_pipeline(options)
+    if cache_stats is not None:
+        print(cache_stats.summary())
+    return ok
+
+def add_fetch_arguments(parser):
+    parser.add_argument('--fetch-workers', type=int, default=junk.CRAWL_WORKERS, help="pages fetched in parallel")
+    parser.add_argument('--page-size', type=int, default=junk.CRAWL_PAGE_SIZE, help="products per page")
+    parser.add_argument('--rate-limit', type=float, default=junk.RATE_LIMIT, help="max sooq requests per second")
+
+def add_transform_arguments(parser):
+    parser.add_argument('--workers', type=int, default=1, help="mapping processes (0 = one per CPU)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="products per worker task")
+    parser.add_argument('--cache', nargs='?', const=CACHE_FILE, default=os.getenv('DESCRIPTION_CACHE_FILE'),
+                        help="reuse formatted descriptions from this SQLite cache")
+    parser.add_argument('--formatter', choices=['bs4', 'fast'], default=os.getenv('DESCRIPTION_FORMATTER', 'bs4'),
+                        help="description engine: BeautifulSoup or the single-pass parser (same output)")
+    parser.add_argument('--compact', action='store_true', default=serializer.COMPACT,
+                        help="write JSON output without indentation")
+
+def add_push_arguments(parser):
+    parser.add_argument('--batch-size', type=int, default=post.BATCH_SIZE,
+                        help=f"products per products/batch request, up to {post.MAX_BATCH_SIZE} (0 = one POST each)")
+    parser.add_argument('--check-images', action='store_true', default=post.CHECK_IMAGES,
+                        help="HEAD-check image URLs first and reuse uploaded media")
+
+def main():
+    common = argparse.ArgumentParser(add_help=False)
+    metrics.add_arguments(common)
+    parser = argparse.ArgumentParser(description="sooq → WooCommerce pipeline")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    fetch = commands.add_parser('fetch', parents=[common], help="fetch the sooq catalog into a snapshot store")
+    fetch.add_argument('--crawl', action='store_true', help="fetch every catalog page instead of one page")
+    fetch.add_argument('--delta', action='store_true',
+                       help="fetch only products added since the last fetch (full crawl once a day)")
+    fetch.add_argument('--output', default=junk.OUTPUT_FILE, help="snapshot store to append to")
+    fetch.add_argument('--export', nargs='?', const=columnar.EXPORT_DIR, metavar='DIR',
+                       help="also export each snapshot to an Arrow file for columnar diffs")
+    add_fetch_arguments(fetch)
+    fetch.set_defaults(run=run_fetch)
+
+    transform = commands.add_parser('transform', parents=[common], help="map a snapshot store to WooCommerce products")
+    transform.add_argument('--input', default=junk.OUTPUT_FILE, help="snapshot store written by fetch")
+    transform.add_argument('--output', default=test2.OUTPUT_FILE, help="mapped products (.jsonl or JSON array)")
+    transform.add_argument('--no-dedup', action='store_true',
+                           help="keep every copy of a product instead of its newest version")
+    add_transform_arguments(transform)
+    transform.set_defaults(run=run_transform)
+
+    push = commands.add_parser('push', parents=[common], help="import mapped products into WooCommerce")
+    push.add_argument('--input', default=test2.OUTPUT_FILE, help="mapped products written by transform")
+    push.add_argument('--resume', action='store_true', help="skip products the last import journaled as done")
+    push.add_argument('--shards', type=int, default=1,
+                      help="import with this many worker processes, each owning a shard of the catalog")
+    push.add_argument('--report', metavar='PATH', help="with --shards, write the merged report here (JSON)")
+    add_push_arguments(push)
+    push.set_defaults(run=run_push)
+
+    sync = commands.add_parser('sync', parents=[common], help="push only new and changed products")
+    sync.add_argument('--input', default=test2.OUTPUT_FILE, help="mapped products written by transform")
+    sync.add_argument('--delete-missing', action='store_true', help="delete products that left the feed")
+    add_push_arguments(sync)
+    sync.set_defaults(run=run_sync)
+
+    stream = commands.add_parser('stream', parents=[common],
+                                 help="crawl, map and import in one pass without intermediate files")
+    stream.add_argument('--resume', action='store_true', help="skip products the last import journaled as done")
+    stream.add_argument('--save-fetched', metavar='PATH', help="also keep the raw products (checkpoint for transform)")
+    stream.add_argument('--save-products', metavar='PATH', help="also keep the mapped products (checkpoint for push)")
+    stream.add_argument('--async', dest='use_async', action='store_true',
+                        help="run every stage on one asyncio event loop (needs aiohttp)")
+    stream.add_argument('--in-flight', type=int, default=async_http.PER_HOST,
+                        help="with --async, requests kept in flight per host")
+    add_fetch_arguments(stream)
+    add_transform_arguments(stream)
+    add_push_arguments(stream)
+    stream.set_defaults(run=run_stream)
+
+    args = parser.parse_args()
+    metrics.configure_from_args(args)
+    print(f"🛒 Pipeline: {args.command}")
+    print("------------------------------------")
+    ok = args.run(args)
+    post.client.close()
+    metrics.finish(args.command)
+    print("✅ Done" if ok else "⚠️ Finished with errors")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
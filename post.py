@@ -1,7 +1,16 @@
-import json
-import requests
+import argparse
+import glob
 import os
 from dotenv import load_dotenv
+from http_client import HttpClient
+import serializer
+import metrics
+from category_index import CategoryIndex, slugify
+from sync_state import STATE_FILE, SyncState, payload_hash
+from progress_journal import JOURNAL_FILE, ProgressJournal
+from snapshot_store import iter_records
+from image_preflight import IMAGE_CACHE_FILE, ImageIndex, preflight_images
+from woo_schema import validate_product
 
 
 load_dotenv()
@@ -13,118 +22,638 @@ BASE_URL = os.getenv('WC_BASE_URL')
 PRODUCTS_URL = f'{BASE_URL}/products'
 CATEGORIES_URL = f'{BASE_URL}/products/categories'
 CATEGORY_BATCH_URL = f'{BASE_URL}/products/categories/batch'
+PRODUCTS_BATCH_URL = f'{BASE_URL}/products/batch'
 
 # Local JSON file
 SOURCE_FILE = 'final9.json'
 
+# Batch import (0 = one POST per product, WooCommerce allows up to 100 per batch)
+MAX_BATCH_SIZE = 100
+BATCH_SIZE = int(os.getenv('WC_BATCH_SIZE', '0'))
+# products/batch request bodies are packed to stay under this size (PHP post_max_size is often 8M)
+MAX_BATCH_BYTES = int(os.getenv('WC_MAX_BATCH_BYTES', str(2 * 1024 * 1024)))
+BATCH_BODY_OVERHEAD = 64  # bytes of {"create":[...],"update":[...]} around the items
+
+# Progress journal used by --resume
+PROGRESS_JOURNAL_FILE = os.getenv('WC_JOURNAL_FILE', JOURNAL_FILE)
+
+# Image pre-flight: HEAD-check image URLs before upload and reuse uploaded media IDs
+CHECK_IMAGES = os.getenv('WC_CHECK_IMAGES', '0') == '1'
+IMAGE_INDEX_FILE = os.getenv('WC_IMAGE_CACHE_FILE', IMAGE_CACHE_FILE)
+image_index = None  # ImageIndex while an import with image checks runs
+
+# Incremental sync state (publicId -> WooCommerce product ID + payload hash)
+SYNC_STATE_FILE = os.getenv('WC_SYNC_STATE_FILE', STATE_FILE)
+
+# Shared connection pool; WC_MAX_WORKERS requests (or batches) are kept in flight,
+# retried on 429/5xx and throttled to WC_RATE_LIMIT requests per second if set
+MAX_WORKERS = int(os.getenv('WC_MAX_WORKERS', '8'))
+KEEP_ALIVE = os.getenv('WC_KEEP_ALIVE', '1') != '0'
+MAX_RETRIES = int(os.getenv('WC_MAX_RETRIES', '5'))
+RATE_LIMIT = float(os.getenv('WC_RATE_LIMIT', '0')) or None
+client = HttpClient(
+    auth=(WC_CONSUMER_KEY, WC_CONSUMER_SECRET),
+    max_workers=MAX_WORKERS,
+    keep_alive=KEEP_ALIVE,
+    max_retries=MAX_RETRIES,
+    rate_limit=RATE_LIMIT
+)
+
 def fetch_categories():
-    """Fetch all existing WooCommerce categories"""
-    response = requests.get(
-        CATEGORIES_URL,
-        auth=(WC_CONSUMER_KEY, WC_CONSUMER_SECRET),
-        params={'per_page': 100}  # Get all categories
-    )
-    if response.status_code == 200:
-        return response.json()
-    else:
-        print(f"❌ Failed to fetch categories: {response.status_code}")
-        return []
+    """Fetch all existing WooCommerce categories, following every page"""
+    categories = []
+    page = 1
+    while True:
+        response = client.get(
+            CATEGORIES_URL,
+            params={'per_page': 100, 'page': page}
+        )
+        if response.status_code != 200:
+            print(f"❌ Failed to fetch categories (page {page}): {response.status_code}")
+            return categories
+        batch = serializer.loads(response.content)
+        categories.extend(batch)
+        total_pages = int(response.headers.get('X-WP-TotalPages', 0) or 0)
+        if len(batch) < 100 or (total_pages and page >= total_pages):
+            return categories
+        page += 1
 
 def create_category(category_name):
     """Create a single category in WooCommerce"""
     data = {
         "name": category_name,
-        "slug": category_name.lower().replace(' ', '-')
+        "slug": slugify(category_name)
     }
-    response = requests.post(
+    response = client.post(
         CATEGORIES_URL,
-        auth=(WC_CONSUMER_KEY, WC_CONSUMER_SECRET),
         headers={"Content-Type": "application/json"},
-        data=json.dumps(data)
+        data=serializer.dumps_bytes(data)
     )
+    return created_category(category_name, response)
+
+def created_category(category_name, response):
+    """The category a products/categories response created, or None"""
     if response.status_code in [200, 201]:
         print(f"🆕 Created new category: {category_name}")
-        return response.json()
+        return serializer.loads(response.content)
     else:
         print(f"❌ Failed to create category '{category_name}': {response.status_code} - {response.text}")
         return None
 
-def get_or_create_category(category_name, existing_categories):
+def create_categories(category_names):
+    """Create categories through products/categories/batch, 100 at a time
+
+    Returns the created categories. Names WooCommerce reports as already
+    existing (``term_exists``) are returned with the existing term's ID.
+    """
+    created = []
+    for start in range(0, len(category_names), MAX_BATCH_SIZE):
+        names = category_names[start:start + MAX_BATCH_SIZE]
+        response = client.post(
+            CATEGORY_BATCH_URL,
+            headers={"Content-Type": "application/json"},
+            data=category_batch_body(names)
+        )
+        created.extend(created_categories(names, response))
+    return created
+
+def category_batch_body(names):
+    return serializer.dumps_bytes({"create": [{"name": name, "slug": slugify(name)} for name in names]})
+
+def created_categories(names, response):
+    """Categories a products/categories/batch response created (or found existing) for ``names``"""
+    if response.status_code not in [200, 201]:
+        print(f"❌ Failed to create {len(names)} categories: {response.status_code} - {response.text}")
+        return []
+
+    created = []
+    for name, result in zip(names, serializer.loads(response.content).get('create', [])):
+        error = result.get('error')
+        if not error:
+            print(f"🆕 Created new category: {name}")
+            created.append(result)
+        elif error.get('code') == 'term_exists' and (error.get('data') or {}).get('resource_id'):
+            created.append({"id": error['data']['resource_id'], "name": name, "slug": slugify(name)})
+        else:
+            print(f"❌ Failed to create category '{name}': {error.get('code')} - {error.get('message')}")
+    return created
+
+def get_or_create_category(category_name, category_index):
     """Get existing category or create new one if it doesn't exist"""
     if not category_name:
         return None
     
     # Check if category exists
-    for cat in existing_categories:
-        if cat['name'].lower() == category_name.lower():
-            return cat['id']
+    category_id = category_index.get(category_name)
+    if category_id is not None:
+        return category_id
     
     # Create new category if not found
     new_category = create_category(category_name)
     if new_category:
-        existing_categories.append(new_category)  # Add to our local list
+        category_index.add(new_category)  # Add to our local index
         return new_category['id']
     return None
 
-def process_products():
-    """Main function to process and post products"""
+def category_name_for(product):
+    """Category a product goes in: its first category, else the first word of its name"""
+    if 'categories' in product and product['categories']:
+        # Use the first category from JSON if provided
+        return product['categories'][0].get('name')
+    # Try to extract category from product name (first word)
+    words = product['name'].split()
+    return words[0] if words else None
+
+def precheck_product(product):
+    """Problems ``prepare_product`` would reject a product for, other than its category"""
+    cleaned = clean_product(dict(product))
+    if image_index is not None and cleaned.get('images'):
+        cleaned['images'] = image_index.rewrite(cleaned['images'])
+    return validate_product(cleaned, categories=False)
+
+def category_names(products):
+    """Categories of the products that will pass validation, so invalid ones never create any"""
+    return [category_name_for(product) for product in products
+            if product.get('name') and not precheck_product(product)]
+
+@metrics.timed('category_resolution')
+def resolve_categories(category_index, products):
+    """Batch-create the categories ``products`` need that aren't indexed yet"""
+    missing = category_index.missing(category_names(products))
+    if missing:
+        print(f"📂 Creating {len(missing)} missing categories...")
+        for category in create_categories(missing):
+            category_index.add(category)
+
+def load_category_index(products):
+    """Index every existing category and batch-create the ones products need"""
+    category_index = CategoryIndex(fetch_categories())
+    resolve_categories(category_index, products)
+    return category_index
+
+def open_image_index(products):
+    """Load the image index and check every new image URL the products use"""
+    index = ImageIndex(IMAGE_INDEX_FILE)
+    urls = [image.get('src') for product in products for image in product.get('images') or []]
+    preflight_images(urls, index)
+    return index
+
+def clean_product(product):
+    """Clean product data in place; WooCommerce rejects null prices and quantities, so missing ones are left out"""
+    product.pop('id', None)
+    for field in ['price', 'regular_price', 'sale_price']:
+        if field in product and product[field] is None:
+            del product[field]
+        elif field in product:
+            product[field] = str(product[field])
+    if 'stock_quantity' in product and product['stock_quantity'] is None:
+        del product['stock_quantity']
+    product.setdefault('type', 'simple')
+    return product
+
+def prepare_product(i, product, category_index, create_missing=True):
+    """Clean a mapped product and resolve its category, or return None to skip it
+
+    With ``create_missing`` False a category missing from the index is not
+    created, and the product is skipped.
+    """
+    product_name = product.get('name', '')
+    if not product_name:
+        print(f"⏭️ Skipping product {i}: No name provided")
+        return None
+
+    clean_product(product)
+
+    # Drop dead image URLs and point already-uploaded ones at their media ID
+    if image_index is not None and product.get('images'):
+        product['images'] = image_index.rewrite(product['images'])
+
+    # Catch what the server would reject before sending it, and before creating a category for it
+    problems = validate_product(product, categories=False)
+    if problems:
+        print(f"⏭️ Skipping product {i}: invalid for WooCommerce ({'; '.join(problems)})")
+        metrics.count('products_invalid')
+        return None
+
+    # Handle categories
+    if create_missing:
+        category_id = get_or_create_category(category_name_for(product), category_index)
+    else:
+        category_id = category_index.get(category_name_for(product))
+
+    if not category_id:
+        print(f"⏭️ Skipping product {i}: Could not determine category for '{product_name}'")
+        return None
+
+    product['categories'] = [{"id": category_id}]
+    return product
+
+@metrics.timed('post_product')
+def post_product(item):
+    """Post a single (index, key, product) item to WooCommerce
+
+    Returns ``[(key, wc_id, error)]`` for the progress journal.
+    """
+    i, key, product = item
+    try:
+        response = client.post(
+            PRODUCTS_URL,
+            headers={"Content-Type": "application/json"},
+            data=serializer.dumps_bytes(product)
+        )
+        return product_outcome(item, response)
+    except Exception as e:
+        print(f"❌ Error posting product {i}: {str(e)}")
+        return [(key, None, str(e))]
+
+def product_outcome(item, response):
+    """Journal entries for the response to one product POST"""
+    i, key, product = item
+    if response.status_code in [200, 201]:
+        category_id = product['categories'][0]['id']
+        print(f"✅ Product {i}: '{product['name']}' posted successfully with category ID {category_id}.")
+        result = serializer.loads(response.content)
+        if image_index is not None:
+            image_index.record_media(product.get('images', []), result.get('images'))
+        return [(key, result.get('id'), None)]
+    print(f"❌ Failed to post product {i}: {response.status_code} - {response.text}")
+    return [(key, None, f"HTTP {response.status_code}")]
+
+def batch_body(groups):
+    """products/batch request body from items already encoded by ``pack_batches``
+
+    ``groups`` maps an action ("create", "update", "delete") to the encoded
+    items; empty actions are left out.
+    """
+    actions = (b'"%s":[%s]' % (action.encode(), b','.join(parts)) for action, parts in groups.items() if parts)
+    return b'{' + b','.join(actions) + b'}'
+
+@metrics.timed('post_batch')
+def post_product_batch(packed):
+    """Create a packed batch of (index, key, product) items through products/batch.
+
+    WooCommerce answers with one entry per created item, in request order;
+    failed items carry an ``error`` object instead of failing the whole batch.
+    Returns ``(key, wc_id, error)`` for every item in the batch.
+    """
+    batch, parts = packed
+    first, last = batch[0][0], batch[-1][0]
+    try:
+        response = client.post(
+            PRODUCTS_BATCH_URL,
+            headers={"Content-Type": "application/json"},
+            data=batch_body({"create": parts})
+        )
+    except Exception as e:
+        print(f"❌ Error posting batch {first}-{last}: {str(e)}")
+        return [(key, None, str(e)) for _, key, _ in batch]
+    return batch_outcomes(batch, response)
+
+def batch_outcomes(batch, response):
+    """Journal entries for the response to one products/batch create of ``batch``"""
+    first, last = batch[0][0], batch[-1][0]
+    if response.status_code not in [200, 201]:
+        print(f"❌ Failed to post batch {first}-{last}: {response.status_code} - {response.text}")
+        return [(key, None, f"HTTP {response.status_code}") for _, key, _ in batch]
+
+    results = serializer.loads(response.content).get('create', [])
+    outcomes = []
+    for (i, key, product), result in zip(batch, results):
+        error = result.get('error')
+        if error:
+            print(f"❌ Failed to post product {i} '{product['name']}': {error.get('code')} - {error.get('message')}")
+            outcomes.append((key, None, f"{error.get('code')} - {error.get('message')}"))
+        else:
+            print(f"✅ Product {i}: '{product['name']}' posted successfully with ID {result.get('id')}.")
+            if image_index is not None:
+                image_index.record_media(product.get('images', []), result.get('images'))
+            outcomes.append((key, result.get('id'), None))
+    if len(results) < len(batch):
+        print(f"⚠️ Batch {first}-{last}: server returned {len(results)} results for {len(batch)} products")
+        outcomes.extend((key, None, "missing from batch response") for _, key, _ in batch[len(results):])
+    return outcomes
+
+def product_key(i, product):
+    """Journal key for a product: its sooq publicId, or its position when it has none"""
+    public_id = product.get('id')
+    return str(public_id) if public_id is not None else f"#{i}"
+
+def prepare_products(products, category_index, journal, resume=False, start=1, create_missing=True):
+    """Yield (index, key, product) items ready to post, skipping invalid products
+
+    Each yielded product is marked pending in the journal; with ``resume``
+    products the journal already has as done are skipped. Products are
+    numbered from ``start``.
+    """
+    skipped = 0
+    for i, product in enumerate(products, start=start):
+        key = product_key(i, product)
+        if resume and journal.is_done(key):
+            skipped += 1
+            continue
+        try:
+            product = prepare_product(i, product, category_index, create_missing)
+            if product is not None:
+                journal.mark_pending(key, i)
+                yield i, key, product
+        except Exception as e:
+            print(f"❌ Error preparing product {i}: {str(e)}")
+    if skipped:
+        print(f"⏩ Skipped {skipped} products already imported")
+
+def batched(items, size):
+    """Group an iterable into lists of at most ``size`` items"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def pack_batches(items, encode, max_items=MAX_BATCH_SIZE, max_bytes=MAX_BATCH_BYTES):
+    """Group items into products/batch requests limited by item count and body size
+
+    ``encode`` gives the JSON bytes an item adds to the body. Yields
+    ``(batch, parts)`` with each item's encoding, so ``batch_body`` can join
+    them without encoding anything twice. An item larger than ``max_bytes``
+    on its own still goes out, alone.
+    """
+    batch, parts, size = [], [], BATCH_BODY_OVERHEAD
+    for item in items:
+        part = encode(item)
+        if batch and (len(batch) >= max_items or size + len(part) + 1 > max_bytes):
+            yield batch, parts
+            batch, parts, size = [], [], BATCH_BODY_OVERHEAD
+        if BATCH_BODY_OVERHEAD + len(part) > max_bytes:
+            print(f"⚠️ Item of {len(part)} bytes is larger than the {max_bytes}-byte batch limit, sending it alone")
+        batch.append(item)
+        parts.append(part)
+        size += len(part) + 1
+    if batch:
+        yield batch, parts
+
+def load_products(path):
+    """Mapped products from transform's output: a JSON array or a .jsonl file, one product per line"""
+    return list(iter_records(path))
+
+def process_products(batch_size=BATCH_SIZE, resume=False, check_images=CHECK_IMAGES):
+    """Main function to process and post products
+
+    Categories are resolved on the main thread; the product POSTs (or, with
+    ``batch_size`` > 0, products/batch creates of at most ``MAX_BATCH_SIZE``
+    items and ``MAX_BATCH_BYTES`` bytes) run on the shared client's worker pool. Every outcome goes to the
+    progress journal, so ``resume`` can pick up after a crash and send only
+    the products that failed or never finished.
+    """
     # Load product data
-    with open(SOURCE_FILE, 'r', encoding='utf-8') as f:
-        products = json.load(f)
-    
-    # Load existing categories
-    categories = fetch_categories()
+    products = load_products(SOURCE_FILE)
+
+    global image_index
+    journal = ProgressJournal(PROGRESS_JOURNAL_FILE)
+    if not resume:
+        journal.reset()
     
-    # Process each product
+    # Check images first, then load existing categories and create the missing ones up front
+    if check_images:
+        image_index = open_image_index(products)
+    category_index = load_category_index(products)
+
+    prepared = prepare_products(products, category_index, journal, resume)
+    return post_prepared(prepared, journal, batch_size)
+
+def post_prepared(prepared, journal, batch_size=BATCH_SIZE):
+    """Post prepared items on the client's worker pool and journal every outcome
+
+    Closes the journal (and the image index) at the end and returns the
+    journal's status counts.
+    """
+    batch_size = min(batch_size, MAX_BATCH_SIZE)
+    if batch_size > 0:
+        packed = pack_batches(prepared, lambda item: serializer.dumps_bytes(item[2]), batch_size)
+        results = client.map(post_product_batch, packed)
+    else:
+        results = client.map(post_product, prepared)
+    for outcomes in results:
+        record_outcomes(journal, outcomes)
+    return close_journal(journal)
+
+def record_outcomes(journal, outcomes):
+    """Write one request's ``(key, wc_id, error)`` outcomes to the journal"""
+    for key, wc_id, error in outcomes:
+        journal.record(key, wc_id, error)
+        metrics.count('products_posted', outcome='failed' if error else 'done')
+    journal.commit()
+
+def close_journal(journal):
+    """End of an import: close the journal and image index, report and return the status counts"""
+    global image_index
+    counts = journal.counts()
+    journal.close()
+    if image_index is not None:
+        image_index.close()
+        image_index = None
+    print(f"📊 Journal: {counts.get('done', 0)} done, {counts.get('failed', 0)} failed, "
+          f"{counts.get('pending', 0)} pending")
+    metrics.log('import_finished', **counts)
+    return counts
+
+def push_products(products, batch_size=BATCH_SIZE, resume=False, check_images=CHECK_IMAGES):
+    """Post products from any iterable while it is still being produced
+
+    Unlike ``process_products`` nothing is loaded up front: categories (and,
+    with ``check_images``, image URLs) are resolved for one group of
+    ``MAX_BATCH_SIZE`` products at a time, just before that group is posted.
+    """
+    global image_index
+    journal = ProgressJournal(PROGRESS_JOURNAL_FILE)
+    if not resume:
+        journal.reset()
+    category_index = CategoryIndex(fetch_categories())
+    if check_images:
+        image_index = ImageIndex(IMAGE_INDEX_FILE)
+
+    def prepared():
+        position = 1
+        for group in batched(products, MAX_BATCH_SIZE):
+            if image_index is not None:
+                preflight_images([image.get('src') for product in group for image in product.get('images') or []],
+                                 image_index)
+            resolve_categories(category_index, group)
+            yield from prepare_products(group, category_index, journal, resume, start=position)
+            position += len(group)
+
+    return post_prepared(prepared(), journal, batch_size)
+
+def plan_sync(products, category_index, state, delete_missing=False):
+    """Yield (action, index, publicId, payload, hash) for every product that needs a request
+
+    Products whose payload hash matches the last successful push are skipped
+    without a request. With ``delete_missing``, products recorded in the state
+    but gone from the feed are yielded as deletes at the end; a product still
+    in the feed is never deleted, even when it was skipped as invalid.
+    """
+    seen = set()  # every publicId in the feed, prepared or skipped, so none of them is deleted
+    unchanged = 0
     for i, product in enumerate(products, start=1):
-        try:
-            product_name = product.get('name', '')
-            if not product_name:
-                print(f"⏭️ Skipping product {i}: No name provided")
+        public_id = product.get('id')
+        if public_id is not None:
+            public_id = str(public_id)
+            if public_id in seen:
+                print(f"⏭️ Skipping product {i}: duplicate publicId {public_id}")
                 continue
-            
-            # Clean product data
-            product.pop('id', None)
-            for field in ['price', 'regular_price', 'sale_price']:
-                if field in product and product[field] is not None:
-                    product[field] = str(product[field])
-            
-            product.setdefault('type', 'simple')
-            
-            # Handle categories
-            if 'categories' in product and product['categories']:
-                # Use the first category from JSON if provided
-                category_name = product['categories'][0].get('name')
-                category_id = get_or_create_category(category_name, categories)
-            else:
-                # Try to extract category from product name (first word)
-                category_name = product_name.split()[0]
-                category_id = get_or_create_category(category_name, categories)
-            
-            if not category_id:
-                print(f"⏭️ Skipping product {i}: Could not determine category for '{product_name}'")
+            seen.add(public_id)
+        source_images = product.get('images')
+        try:
+            product = prepare_product(i, product, category_index)
+        except Exception as e:
+            print(f"❌ Error preparing product {i}: {str(e)}")
+            continue
+        if product is None:
+            continue
+
+        # Hashed with the feed's image URLs: once an upload turns {"src"} into {"id"} the hash must not change
+        digest = payload_hash(dict(product, images=source_images) if source_images is not None else product)
+        if public_id is None:
+            print(f"⚠️ Product {i} has no publicId, creating it without tracking")
+            yield 'create', i, None, product, digest
+            continue
+
+        known = state.get(public_id)
+        if known is None:
+            yield 'create', i, public_id, product, digest
+        elif known[1] == digest:
+            unchanged += 1
+        else:
+            yield 'update', i, public_id, dict(product, id=known[0]), digest
+
+    print(f"💤 {unchanged} products unchanged since the last sync")
+    if delete_missing:
+        for public_id, wc_id in state.items():
+            if public_id not in seen:
+                yield 'delete', None, public_id, wc_id, None
+
+@metrics.timed('sync_batch')
+def post_sync_batch(packed):
+    """Send one packed products/batch request of creates, updates and deletes
+
+    Returns (operation, result) pairs; on a failed request every result is
+    None so nothing gets recorded in the sync state.
+    """
+    batch, parts = packed
+    groups = {"create": [], "update": [], "delete": []}
+    for (action, _, _, _, _), part in zip(batch, parts):
+        groups[action].append(part)
+    try:
+        response = client.post(
+            PRODUCTS_BATCH_URL,
+            headers={"Content-Type": "application/json"},
+            data=batch_body(groups)
+        )
+        if response.status_code not in [200, 201]:
+            print(f"❌ Failed to sync batch of {len(batch)}: {response.status_code} - {response.text}")
+            return [(op, None) for op in batch]
+        results = serializer.loads(response.content)
+    except Exception as e:
+        print(f"❌ Error syncing batch of {len(batch)}: {str(e)}")
+        return [(op, None) for op in batch]
+
+    queues = {action: iter(results.get(action, [])) for action in groups}
+    return [(op, next(queues[op[0]], None)) for op in batch]
+
+def import_journals():
+    """Progress journals left by earlier imports, the single-process one and every shard's"""
+    root, ext = os.path.splitext(PROGRESS_JOURNAL_FILE)
+    shards = sorted(glob.glob(f"{glob.escape(root)}.*of*{glob.escape(ext)}"))
+    return ([PROGRESS_JOURNAL_FILE] if os.path.exists(PROGRESS_JOURNAL_FILE) else []) + shards
+
+def seed_sync_state(state):
+    """Adopt the products earlier imports created, so a first sync updates them instead of creating duplicates"""
+    seeded = 0
+    for path in import_journals():
+        journal = ProgressJournal(path)
+        seeded += state.seed((key, wc_id) for key, wc_id in journal.imported() if not key.startswith('#'))
+        journal.close()
+    if seeded:
+        state.commit()
+        print(f"🔗 Adopted {seeded} products from the import journal")
+
+def sync_products(delete_missing=False, batch_size=BATCH_SIZE, check_images=CHECK_IMAGES):
+    """Push only new and changed products (and optionally deletes) through products/batch
+
+    Returns the counts of created, updated, deleted and failed products.
+    """
+    global image_index
+    products = load_products(SOURCE_FILE)
+
+    if check_images:
+        image_index = open_image_index(products)
+    category_index = load_category_index(products)
+    state = SyncState(SYNC_STATE_FILE)
+    seed_sync_state(state)
+    counts = {"create": 0, "update": 0, "delete": 0, "failed": 0}
+    batch_size = min(batch_size or MAX_BATCH_SIZE, MAX_BATCH_SIZE)
+
+    operations = plan_sync(products, category_index, state, delete_missing)
+    packed = pack_batches(operations, lambda op: serializer.dumps_bytes(op[3]), batch_size)
+    for results in client.map(post_sync_batch, packed):
+        for (action, i, public_id, payload, digest), result in results:
+            label = f"product {i}" if i else f"publicId {public_id}"
+            error = result.get('error') if result is not None else None
+            if result is None or error:
+                counts["failed"] += 1
+                metrics.count('products_synced', action=action, outcome='failed')
+                if error:
+                    print(f"❌ Failed to {action} {label}: {error.get('code')} - {error.get('message')}")
+                    if action != 'create' and error.get('code') == 'woocommerce_rest_product_invalid_id':
+                        state.remove(public_id)  # gone from the store, recreate on the next sync
                 continue
-            
-            product['categories'] = [{"id": category_id}]
-            
-            # Post product to WooCommerce
-            response = requests.post(
-                PRODUCTS_URL,
-                auth=(WC_CONSUMER_KEY, WC_CONSUMER_SECRET),
-                headers={"Content-Type": "application/json"},
-                data=json.dumps(product)
-            )
-            
-            if response.status_code in [200, 201]:
-                print(f"✅ Product {i}: '{product_name}' posted successfully with category ID {category_id}.")
+
+            counts[action] += 1
+            metrics.count('products_synced', action=action, outcome='done')
+            if action == 'delete':
+                state.remove(public_id)
+                print(f"🗑️ Deleted {label} (ID {payload})")
             else:
-                print(f"❌ Failed to post product {i}: {response.status_code} - {response.text}")
-        
-        except Exception as e:
-            print(f"❌ Error posting product {i}: {str(e)}")
+                wc_id = result.get('id') if action == 'create' else payload['id']
+                if image_index is not None:
+                    image_index.record_media(payload.get('images', []), result.get('images'))
+                if public_id is not None:
+                    state.record(public_id, wc_id, digest)
+                verb = "Created" if action == 'create' else "Updated"
+                print(f"✅ {verb} {label}: '{payload['name']}' (ID {wc_id})")
+        state.commit()
+    state.close()
+    if image_index is not None:
+        image_index.close()
+        image_index = None
+
+    print(f"📊 Sync: {counts['create']} created, {counts['update']} updated, "
+          f"{counts['delete']} deleted, {counts['failed']} failed")
+    metrics.log('sync_finished', **counts)
+    return counts
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import mapped products into WooCommerce")
+    parser.add_argument('--sync', action='store_true',
+                        help="only push products that changed since the last sync")
+    parser.add_argument('--delete-missing', action='store_true',
+                        help="with --sync, delete products that left the feed")
+    parser.add_argument('--resume', action='store_true',
+                        help="skip products the last import journaled as done")
+    parser.add_argument('--check-images', action='store_true', default=CHECK_IMAGES,
+                        help="HEAD-check image URLs first and reuse uploaded media")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure_from_args(args)
+
     print("🛒 Starting WooCommerce Product Import")
     print("------------------------------------")
-    process_products()
-    print("✅ Import process completed")
\ No newline at end of file
+    if args.sync:
+        sync_products(args.delete_missing, check_images=args.check_images)
+    else:
+        process_products(resume=args.resume, check_images=args.check_images)
+    client.close()
+    print("✅ Import process completed")
+    metrics.finish('sync' if args.sync else 'import')
\ No newline at end of file
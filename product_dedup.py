@@ -0,0 +1,104 @@
+import os
+import sqlite3
+import tempfile
+from category_index import normalize_name
+from snapshot_store import iter_products
+
+INSERT_BATCH = 1000  # index upserts per executemany
+
+def identity(product):
+    """Stable key for a product: its publicId, or its normalized name when it has none"""
+    public_id = product.get("publicId")
+    if public_id not in (None, ""):
+        return f"id:{public_id}"
+    name = product.get("name")
+    if isinstance(name, str) and name.strip():
+        return f"name:{normalize_name(name)}"
+    return None
+
+def version(product, fetch_time):
+    """Sort key for versions of one product: snapshot fetch_time, then createdAt"""
+    return f"{fetch_time or ''}\0{product.get('createdAt') or ''}"
+
+def iter_versions(path):
+    """Return an iterator of (product, fetch_time, record number, from a full snapshot)
+
+    Covers every product in a snapshot store, in file order, without
+    loading a whole snapshot (see ``iter_products``).
+    """
+    return _versions(iter_products(path))
+
+def _versions(products):
+    for product, header, record_number in products:
+        if header is None:
+            yield product, None, record_number, False
+        else:
+            yield product, header.get("fetch_time"), record_number, header.get("mode") == "full"
+
+def iter_deduped(path, index_path=None):
+    """Yield each product in the store once, in its newest version
+
+    Products are matched on ``publicId`` (name only when that is missing);
+    the version from the latest ``fetch_time`` wins, then the latest
+    ``createdAt``, then the later one in the file. A full-catalog snapshot
+    (``mode: full``, written by a crawl) is authoritative: products missing
+    from the latest one were deleted and are dropped. The first pass records
+    the winner of every key in an on-disk SQLite index (a temporary file
+    unless ``index_path`` is given), the second re-reads the store and
+    yields the winners, so memory stays flat however long the history is.
+    The store is opened right away, so a missing file fails here.
+    """
+    return _dedup(path, iter_versions(path), index_path)
+
+def _dedup(path, versions, index_path):
+    temporary = index_path is None
+    if temporary:
+        fd, index_path = tempfile.mkstemp(prefix="dedup-", suffix=".sqlite3", dir=os.path.dirname(os.path.abspath(path)))
+        os.close(fd)
+    conn = sqlite3.connect(index_path)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("DROP TABLE IF EXISTS winners")
+        conn.execute(
+            "CREATE TABLE winners (key TEXT PRIMARY KEY, version TEXT NOT NULL, "
+            "position INTEGER NOT NULL, record INTEGER NOT NULL)"
+        )
+
+        total = 0
+        last_full = -1
+        rows = []
+        upsert = ("INSERT INTO winners VALUES (?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET "
+                  "version = excluded.version, position = excluded.position, record = excluded.record "
+                  "WHERE excluded.version >= winners.version")
+        for position, (product, fetch_time, record_number, full) in enumerate(versions):
+            total += 1
+            if full:
+                last_full = record_number
+            key = identity(product) or f"#{position}"
+            rows.append((key, version(product, fetch_time), position, record_number))
+            if len(rows) >= INSERT_BATCH:
+                conn.executemany(upsert, rows)
+                rows = []
+        conn.executemany(upsert, rows)
+        deleted = conn.execute("DELETE FROM winners WHERE record < ?", (last_full,)).rowcount
+        conn.execute("CREATE INDEX winners_position ON winners (position)")
+        conn.commit()
+
+        # Merge-join the re-read store with the winning positions, both in file order
+        winners = (position for (position,) in conn.execute("SELECT position FROM winners ORDER BY position"))
+        unique = 0
+        next_winner = next(winners, None)
+        for position, (product, _, _, _) in enumerate(iter_versions(path)):
+            if next_winner is None:
+                break
+            if position == next_winner:
+                unique += 1
+                yield product
+                next_winner = next(winners, None)
+        print(f"🧹 Dedup: {total} products in the store, {unique} unique"
+              + (f", {deleted} gone since the last full crawl" if deleted else ""))
+    finally:
+        conn.close()
+        if temporary:
+            os.remove(index_path)
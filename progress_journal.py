@@ -0,0 +1,64 @@
+import sqlite3
+import time
+
+JOURNAL_FILE = "import_journal.sqlite3"
+
+class ProgressJournal:
+    """Durable per-product outcome log for post.py imports
+
+    Each product is keyed by its sooq ``publicId`` (or ``#<index>`` when it
+    has none) and moves from ``pending`` to ``done`` or ``failed``. A resumed
+    run skips ``done`` products; anything still ``pending`` was in flight when
+    the previous run stopped and is sent again.
+    """
+
+    def __init__(self, path=JOURNAL_FILE):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS products ("
+            "key TEXT PRIMARY KEY, position INTEGER, status TEXT NOT NULL, "
+            "wc_id INTEGER, error TEXT, updated_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def reset(self):
+        """Forget every outcome, for a fresh (non-resumed) import"""
+        self.conn.execute("DELETE FROM products")
+        self.conn.commit()
+
+    def is_done(self, key):
+        row = self.conn.execute("SELECT status FROM products WHERE key = ?", (key,)).fetchone()
+        return row is not None and row[0] == 'done'
+
+    def mark_pending(self, key, position):
+        self.conn.execute(
+            "INSERT INTO products (key, position, status, updated_at) VALUES (?, ?, 'pending', ?) "
+            "ON CONFLICT(key) DO UPDATE SET position = excluded.position, status = 'pending', "
+            "error = NULL, updated_at = excluded.updated_at",
+            (key, position, time.time())
+        )
+
+    def record(self, key, wc_id=None, error=None):
+        """Record the outcome of one product: done with its WooCommerce ID, or failed"""
+        self.conn.execute(
+            "UPDATE products SET status = ?, wc_id = ?, error = ?, updated_at = ? WHERE key = ?",
+            ('failed' if error else 'done', wc_id, error, time.time(), key)
+        )
+
+    def commit(self):
+        self.conn.commit()
+
+    def imported(self):
+        """Return (key, wc_id) for every product this journal saw created"""
+        return self.conn.execute(
+            "SELECT key, wc_id FROM products WHERE status = 'done' AND wc_id IS NOT NULL"
+        ).fetchall()
+
+    def counts(self):
+        """Return {status: number of products}"""
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM products GROUP BY status"))
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
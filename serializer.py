@@ -0,0 +1,67 @@
+import json
+import os
+
+try:
+    import orjson
+except ImportError:  # optional: much faster encode/decode when installed
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # optional: used when orjson is missing
+    msgspec = None
+
+def _default_backend():
+    if orjson is not None:
+        return 'orjson'
+    if msgspec is not None:
+        return 'msgspec'
+    return 'json'
+
+BACKEND = os.getenv('JSON_BACKEND') or _default_backend()  # "orjson", "msgspec" or "json"
+COMPACT = os.getenv('JSON_COMPACT', '0') == '1'  # files without indentation or spaces
+
+# What loads() raises for malformed input, whatever the backend
+DecodeError = (ValueError, msgspec.DecodeError) if msgspec is not None else ValueError
+
+if BACKEND == 'msgspec' and msgspec is not None:
+    _encoder = msgspec.json.Encoder()
+    _decoder = msgspec.json.Decoder()
+
+def dumps_bytes(obj, indent=False):
+    """Encode ``obj`` to UTF-8 JSON bytes, compact unless ``indent``
+
+    Non-ASCII text is written as-is. The bytes can go straight into a request
+    body, so a payload is encoded once however many times it is retried.
+    """
+    if BACKEND == 'orjson' and orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    if BACKEND == 'msgspec' and msgspec is not None:
+        encoded = _encoder.encode(obj)
+        return msgspec.json.format(encoded, indent=2) if indent else encoded
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def dumps(obj, indent=False):
+    """``dumps_bytes`` as a str"""
+    return dumps_bytes(obj, indent).decode('utf-8')
+
+def loads(data):
+    """Decode JSON from str or bytes"""
+    if BACKEND == 'orjson' and orjson is not None:
+        return orjson.loads(data)
+    if BACKEND == 'msgspec' and msgspec is not None:
+        return _decoder.decode(data.encode('utf-8') if isinstance(data, str) else data)
+    return json.loads(data)
+
+def dump(obj, f, compact=None):
+    """Write ``obj`` to text file ``f``: indented like ``json.dump(indent=2)``, or compact
+
+    ``compact`` defaults to the module-wide COMPACT setting.
+    """
+    f.write(dumps(obj, indent=not (COMPACT if compact is None else compact)))
+
+def load(f):
+    """Read a whole JSON document from text file ``f``"""
+    return loads(f.read())
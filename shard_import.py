@@ -0,0 +1,182 @@
+import argparse
+import glob
+import multiprocessing
+import os
+import re
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import metrics
+import post
+import serializer
+from progress_journal import ProgressJournal
+
+SHARDS = 4
+REPORT_FILE = None  # JSON report of the merged per-shard results, if set
+
+def shard_of(product, shards):
+    """Shard a product belongs to: a stable hash of its publicId (its name when it has none)
+
+    crc32 rather than ``hash()``, which is salted per process, so a product
+    lands in the same shard on every run and ``--resume`` finds it in the
+    same journal.
+    """
+    public_id = product.get('id')
+    key = f"id:{public_id}" if public_id is not None else f"name:{product.get('name')}"
+    return zlib.crc32(key.encode('utf-8')) % shards
+
+def split_shards(products, shards):
+    buckets = [[] for _ in range(shards)]
+    for product in products:
+        buckets[shard_of(product, shards)].append(product)
+    return buckets
+
+def journal_file(shard, shards, base=None):
+    """Progress journal of one shard, e.g. import_journal.2of4.sqlite3"""
+    root, ext = os.path.splitext(base or post.PROGRESS_JOURNAL_FILE)
+    return f"{root}.{shard + 1}of{shards}{ext}"
+
+def _shard_journals(base=None):
+    """(path, shard count) of every shard journal on disk, SQLite -wal/-shm files included"""
+    root, ext = os.path.splitext(base or post.PROGRESS_JOURNAL_FILE)
+    for path in glob.glob(f"{glob.escape(root)}.*of*{glob.escape(ext)}*"):
+        match = re.fullmatch(re.escape(root) + r'\.\d+of(\d+)' + re.escape(ext) + r'(-wal|-shm|-journal)?', path)
+        if match:
+            yield path, int(match.group(1))
+
+def other_layouts(shards, base=None):
+    """Shard counts of journals left by earlier runs with a different --shards"""
+    return sorted({count for _, count in _shard_journals(base) if count != shards})
+
+def remove_other_layouts(shards, base=None):
+    """Delete the journals of other --shards layouts, which a fresh run makes stale"""
+    removed = 0
+    for path, count in list(_shard_journals(base)):
+        if count != shards:
+            os.remove(path)
+            removed += 1
+    return removed
+
+def import_shard(shard, shards, products, category_index, journal_path, batch_size, resume):
+    """Worker process: import one shard with its own HTTP session and journal
+
+    Runs in a spawned process, so ``post.client`` is a fresh session that
+    shares no connections with the coordinator or other shards.
+    """
+    started = time.monotonic()
+    print(f"🧩 Shard {shard + 1}/{shards}: importing {len(products)} products")
+    journal = ProgressJournal(journal_path)
+    if not resume:
+        journal.reset()
+    prepared = post.prepare_products(products, category_index, journal, resume)
+    counts = post.post_prepared(prepared, journal, batch_size)
+    post.client.close()
+    return {
+        "shard": shard,
+        "products": len(products),
+        "counts": counts,
+        "seconds": time.monotonic() - started,
+        "metrics": metrics.drain() if metrics.enabled else None,
+    }
+
+def import_sharded(shards=SHARDS, batch_size=post.BATCH_SIZE, resume=False, check_images=post.CHECK_IMAGES):
+    """Import SOURCE_FILE with one worker process per shard and merge their results
+
+    Categories are resolved once, up front, and the index is handed to every
+    worker, so no two workers create the same category. With
+    ``check_images`` the image pre-flight and rewriting also happen up front;
+    media IDs uploaded during a sharded run are not recorded for reuse.
+    Returns the report dict (per-shard results and totals).
+    """
+    if resume and other_layouts(shards):
+        print(f"❌ Journals from a run with {other_layouts(shards)} shards exist; "
+              f"resume with the same --shards or run without --resume")
+        return None
+    if not resume and other_layouts(shards):
+        print(f"🧹 Removing journals of earlier runs with {other_layouts(shards)} shards")
+        remove_other_layouts(shards)
+
+    products = post.load_products(post.SOURCE_FILE)
+
+    if check_images:
+        image_index = post.open_image_index(products)
+        for product in products:
+            if product.get('images'):
+                product['images'] = image_index.rewrite(product['images'])
+        image_index.close()
+    category_index = post.load_category_index(products)
+
+    buckets = split_shards(products, shards)
+    print(f"🧩 Importing {len(products)} products in {shards} shards: {', '.join(str(len(b)) for b in buckets)}")
+    results = []
+    started = time.monotonic()
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=shards, mp_context=context) as executor:
+        futures = [
+            executor.submit(import_shard, shard, shards, bucket, category_index, journal_file(shard, shards),
+                            batch_size, resume)
+            for shard, bucket in enumerate(buckets) if bucket
+        ]
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"❌ Shard worker failed: {str(e)}")
+                continue
+            if result["metrics"]:
+                metrics.merge(result.pop("metrics"))
+            else:
+                result.pop("metrics")
+            results.append(result)
+
+    results.sort(key=lambda result: result["shard"])
+    totals = {}
+    for result in results:
+        for status, value in result["counts"].items():
+            totals[status] = totals.get(status, 0) + value
+    report = {"shards": shards, "seconds": time.monotonic() - started, "totals": totals,
+              "unfinished": len(futures) - len(results), "results": results}
+
+    print("📊 Sharded import:")
+    for result in results:
+        counts = result["counts"]
+        print(f"   shard {result['shard'] + 1}/{shards}: {counts.get('done', 0)} done, "
+              f"{counts.get('failed', 0)} failed, {counts.get('pending', 0)} pending in {result['seconds']:.1f}s")
+    print(f"   total: {totals.get('done', 0)} done, {totals.get('failed', 0)} failed, "
+          f"{totals.get('pending', 0)} pending in {report['seconds']:.1f}s")
+    if report["unfinished"]:
+        print(f"⚠️ {report['unfinished']} shards did not finish, rerun with --resume")
+    metrics.log('sharded_import_finished', shards=shards, **totals)
+    if REPORT_FILE:
+        with open(REPORT_FILE, 'w', encoding='utf-8') as f:
+            serializer.dump(report, f)
+        print(f"📝 Report written to {REPORT_FILE}")
+    return report
+
+def report_ok(report):
+    """True when every shard finished with nothing failed or pending"""
+    return (report is not None and not report["unfinished"]
+            and not report["totals"].get('failed') and not report["totals"].get('pending'))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import mapped products into WooCommerce with several processes")
+    parser.add_argument('--shards', type=int, default=SHARDS, help="worker processes, one shard of the catalog each")
+    parser.add_argument('--input', default=post.SOURCE_FILE, help="mapped products written by transform")
+    parser.add_argument('--batch-size', type=int, default=post.BATCH_SIZE,
+                        help=f"products per products/batch request, up to {post.MAX_BATCH_SIZE} (0 = one POST each)")
+    parser.add_argument('--resume', action='store_true', help="skip products the last import journaled as done")
+    parser.add_argument('--check-images', action='store_true', default=post.CHECK_IMAGES,
+                        help="HEAD-check image URLs first and reuse uploaded media")
+    parser.add_argument('--report', metavar='PATH', default=REPORT_FILE, help="write the merged report here (JSON)")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure_from_args(args)
+    post.SOURCE_FILE = args.input
+    REPORT_FILE = args.report
+
+    print("🛒 Starting sharded WooCommerce Product Import")
+    print("------------------------------------")
+    report = import_sharded(max(1, args.shards), args.batch_size, args.resume, args.check_images)
+    post.client.close()
+    print("✅ Import process completed")
+    metrics.finish('import')
@@ -0,0 +1,186 @@
+import os
+import serializer
+
+try:
+    import ijson
+except ImportError:  # optional: without it every snapshot line is loaded whole
+    ijson = None
+
+LINE_BLOCK = 64 * 1024  # bytes read at a time while parsing one line incrementally
+SCALAR_EVENTS = ('null', 'boolean', 'integer', 'double', 'number', 'string')
+
+def append_record(path, record):
+    """Append one JSON record as a single line and fsync it to disk
+
+    The whole line goes out in one write on an O_APPEND descriptor, so earlier
+    records are never rewritten. If a previous crash left a torn last line it
+    is sealed with a newline first, and the reader skips it.
+    """
+    line = serializer.dumps_bytes(record) + b'\n'
+    is_new = not os.path.exists(path)
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        size = os.fstat(fd).st_size
+        if size:
+            with open(path, 'rb') as f:
+                f.seek(size - 1)
+                if f.read(1) != b'\n':
+                    line = b'\n' + line
+        os.write(fd, line)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+    if is_new:
+        # Make the new directory entry durable as well
+        dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        except OSError:
+            pass
+        finally:
+            os.close(dir_fd)
+
+def append_snapshot(path, snapshot):
+    """Append one fetched snapshot (fetch_time, chunks, ...) to the store"""
+    append_record(path, snapshot)
+
+def iter_records(path):
+    """Return an iterator over the records of a line-delimited store
+
+    The file is opened right away, so a missing store fails here rather than
+    on the first ``next()``. Files written by the old save_to_file (a single
+    JSON array) are still read, but those are loaded whole.
+    """
+    f = open(path, 'r', encoding='utf-8')
+    return _read_records(f, path)
+
+def _read_records(f, path):
+    with f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        if first == '[':
+            f.seek(0)
+            yield from serializer.load(f)
+            return
+
+        f.seek(0)
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield serializer.loads(line)
+            except serializer.DecodeError:
+                print(f"⚠️ Skipping unreadable record on line {line_number} of {path}")
+
+def iter_snapshots(path):
+    """Return an iterator over every snapshot in the store, oldest first"""
+    return iter_records(path)
+
+class _Line:
+    """File-like view of one line of a binary file, for ijson
+
+    Reads the line a block at a time and stops at its newline, so a line
+    is never in memory whole. ``rewind`` goes back to the start of the line.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.start = f.tell()
+        self.rewind()
+
+    def rewind(self):
+        self.f.seek(self.start)
+        self.end = None
+
+    def read(self, size=-1):
+        if self.end is not None or size == 0:
+            return b''
+        position = self.f.tell()
+        block = self.f.read(size if size > 0 else LINE_BLOCK)
+        newline = block.find(b'\n')
+        if newline >= 0:
+            block = block[:newline + 1]
+            self.f.seek(position + len(block))
+        if newline >= 0 or not block:
+            self.end = position + len(block)
+        return block
+
+    def skip(self):
+        """Move past the rest of the line"""
+        while self.read():
+            pass
+
+def _header(line):
+    """Top-level scalar fields of the record on ``line``, plus whether it holds chunks
+
+    Raises ijson.JSONError for a torn line.
+    """
+    header, has_chunks = {}, False
+    for prefix, event, value in ijson.parse(line, use_float=True):
+        if prefix == '' and event == 'map_key' and value == 'chunks':
+            has_chunks = True
+        elif prefix and '.' not in prefix and event in SCALAR_EVENTS:
+            header[prefix] = value
+    return header, has_chunks
+
+def iter_products(path):
+    """Return an iterator of (product, header, record number) over a store
+
+    ``header`` holds the top-level fields of the product's snapshot
+    (fetch_time, mode, ...) and is None for a bare product record. With
+    ijson installed each line is parsed incrementally, twice: once to check
+    it is complete and read its header, once to yield its products, so a
+    snapshot is never in memory as a whole. Without ijson, and for legacy
+    JSON-array files, the records are loaded as in ``iter_records``.
+    Like ``iter_records`` it opens the store right away.
+    """
+    f = open(path, 'rb')
+    if ijson is None or f.read(LINE_BLOCK).lstrip()[:1] == b'[':
+        f.close()
+        return _record_products(iter_records(path))
+    f.seek(0)
+    return _line_products(f, path)
+
+def _record_products(records):
+    for record_number, record in enumerate(records):
+        if "chunks" not in record:
+            yield record, None, record_number
+            continue
+        header = {key: value for key, value in record.items() if not isinstance(value, (dict, list))}
+        for chunk in record.get("chunks", []):
+            for product in chunk.get("products", []):
+                yield product, header, record_number
+
+def _line_products(f, path):
+    with f:
+        record_number = 0
+        line_number = 1
+        while True:
+            ahead = f.peek(1)[:1]
+            if not ahead:
+                break
+            if ahead.isspace():  # blank lines and indentation
+                f.read(1)
+                line_number += ahead == b'\n'
+                continue
+            line = _Line(f)
+            try:
+                header, has_chunks = _header(line)
+            except ijson.JSONError:
+                print(f"⚠️ Skipping unreadable record on line {line_number} of {path}")
+                line.skip()
+                line_number += 1
+                continue
+            line.rewind()
+            if has_chunks:
+                for product in ijson.items(line, 'chunks.item.products.item', use_float=True):
+                    yield product, header, record_number
+            else:
+                for record in ijson.items(line, '', use_float=True):
+                    yield record, None, record_number
+            line.skip()
+            line_number += 1
+            record_number += 1
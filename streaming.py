@@ -0,0 +1,135 @@
+import os
+import serializer
+from snapshot_store import iter_products
+
+try:
+    import ijson
+except ImportError:  # optional: only needed to stream legacy JSON-array files
+    ijson = None
+
+def _is_json_array(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+    return first == '['
+
+PRODUCT_PREFIX = 'item.chunks.item.products.item'  # ijson path of a product inside a snapshot entry
+
+def _array_products(f):
+    """Products of a JSON-array file, from snapshot entries and bare products alike
+
+    A top-level item is built up until it turns out to have ``chunks``; from
+    then on only its products are built, one at a time.
+    """
+    builder = None
+    for prefix, event, value in ijson.parse(f, use_float=True):
+        if prefix == 'item' and event == 'start_map':
+            builder = ijson.ObjectBuilder()
+        elif prefix == 'item' and event == 'map_key' and value == 'chunks':
+            builder = None  # a snapshot entry, not a bare product
+        elif prefix == PRODUCT_PREFIX and event == 'start_map':
+            builder = ijson.ObjectBuilder()
+        if builder is None:
+            continue
+        builder.event(event, value)
+        if event == 'end_map' and prefix in ('item', PRODUCT_PREFIX):
+            yield builder.value
+            builder = None
+
+def _has_records(path):
+    """False for an empty file or an empty JSON array"""
+    with open(path, 'rb') as f:
+        head = f.read(64 * 1024)
+    return b''.join(head.split()) not in (b'', b'[]')
+
+def iter_source_products(path):
+    """Yield source products one at a time from a snapshot file
+
+    Line-delimited stores hold one snapshot (or one bare product) per line,
+    parsed incrementally by ``iter_products``. Legacy JSON-array files, and
+    arrays of bare products such as a ``--save-fetched`` checkpoint, are
+    parsed incrementally with ijson when it is installed and loaded whole
+    otherwise. Raises ValueError when a non-empty file holds no products.
+    """
+    count = 0
+    if _is_json_array(path) and ijson is not None:
+        with open(path, 'rb') as f:
+            for product in _array_products(f):
+                count += 1
+                yield product
+    else:
+        if _is_json_array(path):
+            print(f"⚠️ ijson is not installed, loading {path} whole")
+        for product, _, _ in iter_products(path):
+            count += 1
+            yield product
+    if not count and _has_records(path):
+        raise ValueError(f"no products found in {path}")
+
+class StreamWriter:
+    """Write mapped records to a file as they are produced
+
+    ``.jsonl`` paths get one compact record per line; anything else gets a JSON
+    array laid out exactly like ``json.dump(records, f, indent=2)``, or with no
+    whitespace at all when ``compact`` (default: serializer.COMPACT).
+
+    Records go to ``path + ".tmp"``, which replaces ``path`` only on ``close``;
+    ``abort`` (or leaving the ``with`` block on an exception) deletes it, so
+    a failed run never leaves a valid-looking partial file behind.
+    """
+
+    def __init__(self, path, compact=None):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.lines = path.endswith('.jsonl')
+        self.compact = serializer.COMPACT if compact is None else compact
+        self.count = 0
+        self._file = open(self.tmp_path, 'w', encoding='utf-8')
+        if not self.lines:
+            self._file.write('[')
+
+    def write(self, record):
+        if self.lines:
+            self._file.write(serializer.dumps(record) + '\n')
+        elif self.compact:
+            self._file.write((',' if self.count else '') + serializer.dumps(record))
+        else:
+            text = serializer.dumps(record, indent=True).replace('\n', '\n  ')
+            self._file.write((',\n  ' if self.count else '\n  ') + text)
+        self.count += 1
+
+    def close(self):
+        """Finish the file and move it into place"""
+        if not self.lines:
+            self._file.write('\n]' if self.count and not self.compact else ']')
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        """Drop everything written, leaving ``path`` as it was"""
+        self._file.close()
+        try:
+            os.remove(self.tmp_path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+def close_checkpoints(writers, ok):
+    """Keep the --save-* checkpoints of a complete run; drop partial ones"""
+    for writer in writers:
+        if writer is None:
+            continue
+        if ok:
+            writer.close()
+        else:
+            writer.abort()
+            print(f"⚠️ Run incomplete, not writing {writer.path}")
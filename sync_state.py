@@ -0,0 +1,70 @@
+import hashlib
+import json
+import sqlite3
+
+STATE_FILE = "sync_state.sqlite3"
+
+def payload_hash(product):
+    """Stable content hash of a mapped WooCommerce payload"""
+    encoded = json.dumps(product, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+class SyncState:
+    """Local record of what the last imports pushed to WooCommerce
+
+    Maps each sooq ``publicId`` to the WooCommerce product ID it became and
+    the hash of the payload that was last sent for it. WooCommerce IDs that
+    were deleted, or that the store no longer knows, are kept as tombstones
+    so ``seed`` never brings them back.
+    """
+
+    def __init__(self, path=STATE_FILE):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS products "
+            "(public_id TEXT PRIMARY KEY, wc_id INTEGER NOT NULL, payload_hash TEXT NOT NULL)"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS removed (wc_id INTEGER PRIMARY KEY)")
+        self.conn.commit()
+
+    def get(self, public_id):
+        """Return (wc_id, payload_hash) for ``public_id``, or None if it was never pushed"""
+        return self.conn.execute(
+            "SELECT wc_id, payload_hash FROM products WHERE public_id = ?", (str(public_id),)
+        ).fetchone()
+
+    def record(self, public_id, wc_id, digest):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO products VALUES (?, ?, ?)", (str(public_id), wc_id, digest)
+        )
+
+    def seed(self, pairs):
+        """Adopt (public_id, wc_id) pairs created outside a sync; returns how many were new
+
+        Their payload hash is unknown, so the next sync sends each one an update.
+        Public IDs already in the state and removed WooCommerce IDs are skipped.
+        """
+        before = self.conn.total_changes
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO products SELECT ?, ?, '' WHERE NOT EXISTS (SELECT 1 FROM removed WHERE wc_id = ?)",
+            ((str(key), wc_id, wc_id) for key, wc_id in pairs)
+        )
+        return self.conn.total_changes - before
+
+    def remove(self, public_id):
+        """Forget ``public_id`` and tombstone the WooCommerce ID it had"""
+        self.conn.execute(
+            "INSERT OR IGNORE INTO removed SELECT wc_id FROM products WHERE public_id = ?", (str(public_id),)
+        )
+        self.conn.execute("DELETE FROM products WHERE public_id = ?", (str(public_id),))
+
+    def items(self):
+        """Return every (public_id, wc_id) pair in the store"""
+        return self.conn.execute("SELECT public_id, wc_id FROM products").fetchall()
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
@@ -1,9 +1,20 @@
-import json
+import argparse
 from bs4 import BeautifulSoup
 import re
+import os
+from snapshot_store import iter_snapshots
+from streaming import StreamWriter, iter_source_products
+from parallel_map import CHUNK_SIZE, map_products
+from description_cache import CACHE_FILE, RunStats, get_cache
+import fast_formatter
+import metrics
+import serializer
+from woo_product import WooProduct
+from product_dedup import iter_deduped
 
 SOURCE_FILE = "junk14.json"
 OUTPUT_FILE = "final9.json"
+FORMATTER_VERSION = "test2-1"  # bump whenever format_description output changes
 
 def format_description(html_content):
     """Convert HTML to perfectly formatted plain text with structure"""
@@ -45,69 +56,117 @@ def format_description(html_content):
     
     return text
 
+@metrics.timed('format_description')
+def format_description_cached(html_content):
+    """Format a description with the DESCRIPTION_FORMATTER engine ("bs4" or "fast")
+
+    Goes through the description cache when DESCRIPTION_CACHE_FILE is set.
+    """
+    formatter = fast_formatter.format_description if os.getenv('DESCRIPTION_FORMATTER') == 'fast' else format_description
+    cache_file = os.getenv('DESCRIPTION_CACHE_FILE')
+    if not cache_file or not html_content or not isinstance(html_content, str):
+        return formatter(html_content)
+    return get_cache(cache_file).get_or_format(html_content, FORMATTER_VERSION, formatter)
+
+@metrics.timed('map_product')
+def decode_product(product):
+    """Build a WooProduct from a source product, raising InvalidProduct for bad records"""
+    return WooProduct.from_sooq(product, format_description_cached)
+
 def map_product_to_woocommerce(product):
     """Map the source product to WooCommerce format"""
-    mapped = {
-        "name": product.get("name"),
-        "description": format_description(product.get("description", "")),
-        "short_description": product.get("alias", ""),
-        "price": product.get("price"),
-        "regular_price": product.get("price"),
-        "sale_price": product.get("offerPrice"),
-        "id": product.get("publicId"),
-        "stock_quantity": product.get("quantity"),
-        "stock_status": "instock" if product.get("available") else "outofstock",
-        "tax_status": "taxable" if product.get("taxable") else "none",
-        "images": [{"src": product.get("image_url")}] if product.get("image_url") else [],
-        "on_sale": product.get("onOffer", False),
-        "categories": []
-    }
-    
-    # Add category if available
-    if product.get("departmentResponse"):
-        mapped["categories"].append({
-            "id": 1,
-            "name": product["departmentResponse"].get("name"),
-            "slug": (product.get("listingSectionResponse", {}).get("name") or "").lower().replace(" ", "-")
-        })
-    
-    return mapped
+    return decode_product(product).to_woocommerce()
 
-def process_products():
+def source_products(dedup=True):
+    """Products from SOURCE_FILE: each product once in its newest version, or every copy"""
+    if dedup:
+        return iter_deduped(SOURCE_FILE)
+    data = iter_snapshots(SOURCE_FILE)
+    return (product
+            for entry in data
+            for chunk in entry.get("chunks", [])
+            for product in chunk.get("products", []))
+
+def process_products(workers=1, chunk_size=CHUNK_SIZE, dedup=True):
     try:
-        with open(SOURCE_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        products = source_products(dedup)
     except Exception as e:
         print(f"❌ Error loading {SOURCE_FILE}: {str(e)}")
         return []
     
     results = []
     processed_count = 0
-    
-    for entry in data:
-        for chunk in entry.get("chunks", []):
-            for product in chunk.get("products", []):
-                try:
-                    mapped = map_product_to_woocommerce(product)
-                    if mapped.get("name"):  # Only include products with names
-                        results.append(mapped)
-                        processed_count += 1
-                except Exception as e:
-                    print(f"⚠️ Error processing product: {str(e)}")
-                    continue
+    for record, error in map_products(decode_product, products, workers, chunk_size):
+        if error:
+            print(f"⚠️ Error processing product: {error}")
+            metrics.count('products_mapped', outcome='error')
+            continue
+        results.append(record)
+        processed_count += 1
+        metrics.count('products_mapped', outcome='ok')
     
     try:
-        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
+        # Records are expanded to dicts one at a time as they are written
+        with StreamWriter(OUTPUT_FILE) as writer:
+            for record in results:
+                writer.write(record.to_woocommerce())
         print(f"✅ Successfully processed {processed_count} products")
         return True
     except Exception as e:
         print(f"❌ Error saving to {OUTPUT_FILE}: {str(e)}")
         return False
 
+def process_products_stream(workers=1, chunk_size=CHUNK_SIZE, dedup=True):
+    """Map products one at a time from SOURCE_FILE straight into OUTPUT_FILE"""
+    processed_count = 0
+    try:
+        with StreamWriter(OUTPUT_FILE) as writer:
+            products = iter_deduped(SOURCE_FILE) if dedup else iter_source_products(SOURCE_FILE)
+            for record, error in map_products(decode_product, products, workers, chunk_size):
+                if error:
+                    print(f"⚠️ Error processing product: {error}")
+                    metrics.count('products_mapped', outcome='error')
+                    continue
+                writer.write(record.to_woocommerce())
+                processed_count += 1
+                metrics.count('products_mapped', outcome='ok')
+        print(f"✅ Successfully processed {processed_count} products")
+        return True
+    except Exception as e:
+        print(f"❌ Error streaming {SOURCE_FILE} to {OUTPUT_FILE}: {str(e)}")
+        return False
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Map sooq snapshots to WooCommerce products")
+    parser.add_argument('--stream', action='store_true', help="read, map and write one product at a time")
+    parser.add_argument('--workers', type=int, default=1, help="mapping processes (0 = one per CPU)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="products per worker task")
+    parser.add_argument('--cache', nargs='?', const=CACHE_FILE, default=os.getenv('DESCRIPTION_CACHE_FILE'),
+                        help="reuse formatted descriptions from this SQLite cache")
+    parser.add_argument('--formatter', choices=['bs4', 'fast'], default=os.getenv('DESCRIPTION_FORMATTER', 'bs4'),
+                        help="description engine: BeautifulSoup or the single-pass parser (same output)")
+    parser.add_argument('--compact', action='store_true', default=serializer.COMPACT,
+                        help="write output without indentation")
+    parser.add_argument('--no-dedup', action='store_true',
+                        help="keep every copy of a product instead of its newest version")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure_from_args(args)
+    os.environ['DESCRIPTION_FORMATTER'] = args.formatter
+    serializer.COMPACT = args.compact
+    if args.cache:
+        os.environ['DESCRIPTION_CACHE_FILE'] = args.cache
+        cache_stats = RunStats(args.cache)
+
     print("🛒 WooCommerce Product Processor")
     print("-------------------------------")
     print(f"Processing {SOURCE_FILE}...")
-    process_products()
-    print(f"📁 Output saved to {OUTPUT_FILE}")
\ No newline at end of file
+    if args.stream:
+        ok = process_products_stream(args.workers, args.chunk_size, not args.no_dedup)
+    else:
+        ok = process_products(args.workers, args.chunk_size, not args.no_dedup)
+    if args.cache:
+        print(cache_stats.summary())
+    if ok:
+        print(f"📁 Output saved to {OUTPUT_FILE}")
+    metrics.finish('transform')
\ No newline at end of file
@@ -1,13 +1,28 @@
-import json
-import requests
+import argparse
+import asyncio
 from bs4 import BeautifulSoup
 import re
 import os
+from snapshot_store import iter_snapshots
+from streaming import StreamWriter, iter_source_products
+from parallel_map import CHUNK_SIZE, map_products
+from description_cache import CACHE_FILE, RunStats, get_cache
+import fast_formatter
+import metrics
+import serializer
+from woo_product import WooProduct
+from feature_store import FEATURES_FILE, FeatureStore, fetch_all_features, fetch_all_features_async
+from async_http import PER_HOST, AsyncHttpClient
+from product_dedup import iter_deduped
 
 SOURCE_FILE = "junk16.json"
 PRODUCTS_OUTPUT_FILE = "final11.json"
-FEATURES_FOLDER = "features"
+FEATURES_STORE_FILE = FEATURES_FILE  # one SQLite store keyed by publicId
 FEATURES_BASE_URL = " "  #put the url in this
+FEATURES_MAX_WORKERS = 8  # feature requests kept in flight at once
+FEATURES_ASYNC = False  # fetch features on asyncio (aiohttp) instead of a thread pool
+FEATURES_IN_FLIGHT = PER_HOST  # feature requests kept in flight at once in async mode
+FORMATTER_VERSION = "test3-1"  # bump whenever format_description output changes
 
 def format_description(html_content):
     if not html_content or not isinstance(html_content, str):
@@ -28,91 +43,160 @@ def format_description(html_content):
     text = re.sub(r'([\u2022\u25AA\u25A0])\s+', '- ', text)
     return text.strip()
 
+@metrics.timed('format_description')
+def format_description_cached(html_content):
+    """Format a description with the DESCRIPTION_FORMATTER engine ("bs4" or "fast")
+
+    Goes through the description cache when DESCRIPTION_CACHE_FILE is set.
+    """
+    formatter = fast_formatter.format_description if os.getenv('DESCRIPTION_FORMATTER') == 'fast' else format_description
+    cache_file = os.getenv('DESCRIPTION_CACHE_FILE')
+    if not cache_file or not html_content or not isinstance(html_content, str):
+        return formatter(html_content)
+    return get_cache(cache_file).get_or_format(html_content, FORMATTER_VERSION, formatter)
+
+@metrics.timed('map_product')
+def decode_product(product):
+    """Build a WooProduct whose stock status follows its quantity"""
+    return WooProduct.from_sooq(product, format_description_cached, stock_from_quantity=True)
+
 def map_product_to_woocommerce(product):
-    stock_quantity = product.get("quantity", 0)
-    stock_status = "outofstock" if stock_quantity <= 0 else "instock"
-    product.setdefault('type', 'simple')
-    product['manage_stock'] = True
-    product['backorders'] = 'no'
-    mapped = {
-        "name": product.get("name"),
-        "description": format_description(product.get("description", "")),
-        "short_description": product.get("alias", ""),
-        "price": product.get("price"),
-        "regular_price": product.get("price"),
-        "sale_price": product.get("offerPrice"),
-        "id": product.get("publicId"),
-        "stock_quantity": stock_quantity,
-        "stock_status": stock_status,
-        "tax_status": "taxable" if product.get("taxable") else "none",
-        "images": [{"src": product.get("image_url")}] if product.get("image_url") else [],
-        "on_sale": product.get("onOffer", False),
-        "categories": []
-    }
-    if product.get("departmentResponse"):
-        mapped["categories"].append({
-            "id": 1,
-            "name": product["departmentResponse"].get("name"),
-            "slug": (product.get("listingSectionResponse", {}).get("name") or "").lower().replace(" ", "-")
-        })
-    return mapped
-
-def process_products():
-    # Create the features folder if it doesn't exist
-    os.makedirs(FEATURES_FOLDER, exist_ok=True)
+    return decode_product(product).to_woocommerce()
 
+def save_features(public_ids):
+    """Fetch features for every new or stale product into the feature store"""
+    store = FeatureStore(FEATURES_STORE_FILE)
     try:
-        with open(SOURCE_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        if FEATURES_ASYNC:
+            counts = asyncio.run(fetch_features_async(public_ids, store))
+        else:
+            counts = fetch_all_features(public_ids, store, FEATURES_BASE_URL, FEATURES_MAX_WORKERS)
+    finally:
+        store.close()
+    print(f"✅ Features in {FEATURES_STORE_FILE}: {counts['fetched']} fetched, {counts['unchanged']} unchanged, "
+          f"{counts['fresh']} still fresh, {counts['failed']} failed")
+
+async def fetch_features_async(public_ids, store):
+    async with AsyncHttpClient(per_host=FEATURES_IN_FLIGHT) as client:
+        return await fetch_all_features_async(public_ids, store, FEATURES_BASE_URL, client)
+
+def source_products(dedup=True):
+    """Products from SOURCE_FILE: each product once in its newest version, or every copy"""
+    if dedup:
+        return iter_deduped(SOURCE_FILE)
+    data = iter_snapshots(SOURCE_FILE)
+    return (product
+            for entry in data
+            for chunk in entry.get("chunks", [])
+            for product in chunk.get("products", []))
+
+def process_products(workers=1, chunk_size=CHUNK_SIZE, dedup=True, features=True):
+    try:
+        products = source_products(dedup)
     except Exception as e:
         print(f"❌ Error loading {SOURCE_FILE}: {str(e)}")
         return []
 
     products_result = []
-    seen_names = set()
-    feature_count = 0
+    public_ids = []
 
-    for entry in data:
-        for chunk in entry.get("chunks", []):
-            for product in chunk.get("products", []):
-                try:
-                    mapped = map_product_to_woocommerce(product)
-                    name_key = mapped.get("name", "").strip().lower()
-                    if name_key and name_key not in seen_names:
-                        products_result.append(mapped)
-                        seen_names.add(name_key)
-
-                        public_id = product.get("publicId")
-                        if public_id:
-                            url = FEATURES_BASE_URL.format(public_id)
-                            try:
-                                response = requests.get(url)
-                                if response.status_code == 200:
-                                    feature_data = response.json()
-                                    feature_count += 1
-                                    feature_file = os.path.join(FEATURES_FOLDER, f"feature{feature_count}.json")
-                                    with open(feature_file, 'w', encoding='utf-8') as f:
-                                        json.dump({"publicId": public_id, "features": feature_data}, f, indent=2, ensure_ascii=False)
-                                    print(f"✅ Saved {feature_file}")
-                                else:
-                                    print(f"⚠️ Failed to fetch features for {public_id}")
-                            except Exception as e:
-                                print(f"❌ Error fetching features for {public_id}: {str(e)}")
-                except Exception as e:
-                    print(f"⚠️ Error processing product: {str(e)}")
-                    continue
+    for record, error in map_products(decode_product, products, workers, chunk_size):
+        try:
+            if error:
+                raise ValueError(error)
+            products_result.append(record)
+            metrics.count('products_mapped', outcome='ok')
+
+            public_id = record.public_id
+            if public_id:
+                public_ids.append(public_id)
+        except Exception as e:
+            print(f"⚠️ Error processing product: {str(e)}")
+            metrics.count('products_mapped', outcome='error')
+            continue
+
+    if features:
+        save_features(public_ids)
 
     # Save products data
     try:
-        with open(PRODUCTS_OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(products_result, f, indent=2, ensure_ascii=False)
+        with StreamWriter(PRODUCTS_OUTPUT_FILE) as writer:
+            for record in products_result:
+                writer.write(record.to_woocommerce())
         print(f"✅ Products saved to {PRODUCTS_OUTPUT_FILE}")
     except Exception as e:
         print(f"❌ Error saving products: {str(e)}")
 
+def process_products_stream(workers=1, chunk_size=CHUNK_SIZE, dedup=True, features=True):
+    """Map products one at a time from SOURCE_FILE straight into PRODUCTS_OUTPUT_FILE"""
+    public_ids = []
+    try:
+        with StreamWriter(PRODUCTS_OUTPUT_FILE) as writer:
+            products = iter_deduped(SOURCE_FILE) if dedup else iter_source_products(SOURCE_FILE)
+            for record, error in map_products(decode_product, products, workers, chunk_size):
+                try:
+                    if error:
+                        raise ValueError(error)
+                    writer.write(record.to_woocommerce())
+                    metrics.count('products_mapped', outcome='ok')
+
+                    public_id = record.public_id
+                    if public_id:
+                        public_ids.append(public_id)
+                except Exception as e:
+                    print(f"⚠️ Error processing product: {str(e)}")
+                    metrics.count('products_mapped', outcome='error')
+                    continue
+        print(f"✅ Products saved to {PRODUCTS_OUTPUT_FILE}")
+    except Exception as e:
+        print(f"❌ Error streaming {SOURCE_FILE} to {PRODUCTS_OUTPUT_FILE}: {str(e)}")
+        return
+
+    if features:
+        save_features(public_ids)
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Map sooq snapshots to WooCommerce products and fetch their features")
+    parser.add_argument('--stream', action='store_true', help="read, map and write one product at a time")
+    parser.add_argument('--workers', type=int, default=1, help="mapping processes (0 = one per CPU)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="products per worker task")
+    parser.add_argument('--cache', nargs='?', const=CACHE_FILE, default=os.getenv('DESCRIPTION_CACHE_FILE'),
+                        help="reuse formatted descriptions from this SQLite cache")
+    parser.add_argument('--formatter', choices=['bs4', 'fast'], default=os.getenv('DESCRIPTION_FORMATTER', 'bs4'),
+                        help="description engine: BeautifulSoup or the single-pass parser (same output)")
+    parser.add_argument('--compact', action='store_true', default=serializer.COMPACT,
+                        help="write output without indentation")
+    parser.add_argument('--no-dedup', action='store_true',
+                        help="keep every copy of a product instead of its newest version")
+    parser.add_argument('--no-features', action='store_true', help="skip the feature fetching stage")
+    parser.add_argument('--features-only', action='store_true',
+                        help=f"only fetch features for the products in {PRODUCTS_OUTPUT_FILE}")
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help="fetch features on asyncio, thousands of requests in flight (needs aiohttp)")
+    parser.add_argument('--in-flight', type=int, default=FEATURES_IN_FLIGHT,
+                        help="with --async, feature requests kept in flight")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure_from_args(args)
+    os.environ['DESCRIPTION_FORMATTER'] = args.formatter
+    serializer.COMPACT = args.compact
+    FEATURES_ASYNC = args.use_async
+    FEATURES_IN_FLIGHT = args.in_flight
+    if args.cache:
+        os.environ['DESCRIPTION_CACHE_FILE'] = args.cache
+        cache_stats = RunStats(args.cache)
+
     print("🛒 WooCommerce Product + Features Fetcher")
     print("-----------------------------------------")
-    process_products()
+    if args.features_only:
+        with open(PRODUCTS_OUTPUT_FILE, 'r', encoding='utf-8') as f:
+            save_features(product.get("id") for product in serializer.load(f))
+    elif args.stream:
+        process_products_stream(args.workers, args.chunk_size, not args.no_dedup, not args.no_features)
+    else:
+        process_products(args.workers, args.chunk_size, not args.no_dedup, not args.no_features)
+    if args.cache:
+        print(cache_stats.summary())
     print("✅ All done.")
+    metrics.finish('transform')
 
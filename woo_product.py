@@ -0,0 +1,121 @@
+import math
+
+class InvalidProduct(ValueError):
+    """A sooq product that can't be turned into a WooCommerce product"""
+
+def _check_number(product, field, label):
+    """Return ``product[field]`` if it is missing or numeric, else raise InvalidProduct"""
+    value = product.get(field)
+    if value is None or value == "":
+        return value
+    if isinstance(value, bool):
+        raise InvalidProduct(f"{label}: {field} is not a number ({value!r})")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise InvalidProduct(f"{label}: {field} is not a number ({value!r})") from None
+    if not math.isfinite(number):
+        raise InvalidProduct(f"{label}: {field} is not a number ({value!r})")
+    return value
+
+class WooProduct:
+    """A mapped product with a fixed set of fields
+
+    ``from_sooq`` reads a sooq payload without modifying it and rejects
+    records that could never be imported; ``to_woocommerce`` gives the dict
+    the transform scripts write for post.py. Field values are kept as the
+    feed sent them (prices stay numbers until post.py stringifies them).
+    """
+
+    __slots__ = ('public_id', 'name', 'description', 'short_description', 'price', 'sale_price',
+                 'stock_quantity', 'stock_status', 'taxable', 'image_url', 'on_sale', 'category')
+
+    def __init__(self, public_id, name, description, short_description, price, sale_price,
+                 stock_quantity, stock_status, taxable, image_url, on_sale, category):
+        self.public_id = public_id
+        self.name = name
+        self.description = description
+        self.short_description = short_description
+        self.price = price
+        self.sale_price = sale_price
+        self.stock_quantity = stock_quantity
+        self.stock_status = stock_status
+        self.taxable = taxable
+        self.image_url = image_url
+        self.on_sale = on_sale
+        self.category = category  # (name, slug) or None
+
+    @classmethod
+    def from_sooq(cls, product, format_description=None, stock_from_quantity=False):
+        """Build a record from one sooq product, raising InvalidProduct for bad data
+
+        ``format_description`` turns the description HTML into text. With
+        ``stock_from_quantity`` the stock status follows the quantity rather
+        than the ``available`` flag.
+        """
+        if not isinstance(product, dict):
+            raise InvalidProduct(f"product is a {type(product).__name__}, not an object")
+        label = f"product {product.get('publicId')!r}"
+        name = product.get("name")
+        if not isinstance(name, str) or not name.strip():
+            raise InvalidProduct(f"{label} has no name")
+        price = _check_number(product, "price", label)
+        sale_price = _check_number(product, "offerPrice", label)
+        quantity = _check_number(product, "quantity", label)
+
+        if stock_from_quantity:
+            stock_quantity = quantity if "quantity" in product else 0
+            in_stock = bool(stock_quantity) and float(stock_quantity) > 0
+        else:
+            stock_quantity = quantity
+            in_stock = bool(product.get("available"))
+
+        description = product.get("description", "")
+        if format_description is not None:
+            description = format_description(description)
+
+        category = None
+        department = product.get("departmentResponse")
+        if department:
+            section = (product.get("listingSectionResponse") or {}).get("name") or ""
+            category = (department.get("name"), section.lower().replace(" ", "-"))
+
+        return cls(
+            public_id=product.get("publicId"),
+            name=name,
+            description=description,
+            short_description=product.get("alias", ""),
+            price=price,
+            sale_price=sale_price,
+            stock_quantity=stock_quantity,
+            stock_status="instock" if in_stock else "outofstock",
+            taxable=bool(product.get("taxable")),
+            image_url=product.get("image_url"),
+            on_sale=product.get("onOffer", False),
+            category=category,
+        )
+
+    def to_woocommerce(self):
+        """Return the WooCommerce product dict (a new one on every call)"""
+        mapped = {
+            "name": self.name,
+            "description": self.description,
+            "short_description": self.short_description,
+            "price": self.price,
+            "regular_price": self.price,
+            "sale_price": self.sale_price,
+            "id": self.public_id,
+            "stock_quantity": self.stock_quantity,
+            "stock_status": self.stock_status,
+            "tax_status": "taxable" if self.taxable else "none",
+            "images": [{"src": self.image_url}] if self.image_url else [],
+            "on_sale": self.on_sale,
+            "categories": []
+        }
+        if self.category is not None:
+            name, slug = self.category
+            mapped["categories"].append({"id": 1, "name": name, "slug": slug})
+        return mapped
+
+    def __repr__(self):
+        return f"WooProduct(public_id={self.public_id!r}, name={self.name!r})"
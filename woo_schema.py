@@ -0,0 +1,86 @@
+import re
+
+# Allowed values of the enum fields in the WooCommerce REST product schema
+PRODUCT_TYPES = ('simple', 'grouped', 'external', 'variable')
+STOCK_STATUSES = ('instock', 'outofstock', 'onbackorder')
+TAX_STATUSES = ('taxable', 'shipping', 'none')
+PRICE_FIELDS = ('price', 'regular_price', 'sale_price')
+TEXT_FIELDS = ('description', 'short_description', 'sku')
+
+_DECIMAL = re.compile(r'\d+(\.\d+)?')
+
+def _is_integer(value):
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return True
+    return isinstance(value, float) and value.is_integer()
+
+def _check_image(n, image):
+    if not isinstance(image, dict):
+        return f"images[{n}] is not an object"
+    if 'id' in image:
+        if not _is_integer(image['id']) or image['id'] <= 0:
+            return f"images[{n}].id is not a media ID ({image['id']!r})"
+        return None
+    src = image.get('src')
+    if not isinstance(src, str) or not src.strip():
+        return f"images[{n}] has an empty src"
+    if not src.startswith(('http://', 'https://')):
+        return f"images[{n}].src is not an http(s) URL ({src!r})"
+    return None
+
+def _check_categories(categories):
+    if not isinstance(categories, list) or not categories:
+        return ["categories is empty"]
+    problems = []
+    for n, category in enumerate(categories):
+        category_id = category.get('id') if isinstance(category, dict) else None
+        if not _is_integer(category_id) or category_id <= 0:
+            problems.append(f"categories[{n}] has no category ID")
+    return problems
+
+def validate_product(product, categories=True):
+    """Check a products or products/batch create payload against the WooCommerce schema
+
+    Covers the fields the importer sends: prices must be decimal strings
+    (never ``"None"``), the stock fields integers or known enum values, and
+    the product needs a name, a category ID and images with a real src or
+    media ID. Returns a list of problems, empty when the payload is valid.
+    With ``categories`` False the category IDs are not checked, for a
+    product whose category is not resolved yet.
+    """
+    problems = []
+    name = product.get('name')
+    if not isinstance(name, str) or not name.strip():
+        problems.append("name is empty")
+    if product.get('type', 'simple') not in PRODUCT_TYPES:
+        problems.append(f"type is not one of {', '.join(PRODUCT_TYPES)} ({product['type']!r})")
+
+    for field in PRICE_FIELDS:
+        value = product.get(field)
+        if value is None or value == "":
+            continue
+        if not isinstance(value, str) or not _DECIMAL.fullmatch(value):
+            problems.append(f"{field} is not a decimal string ({value!r})")
+    for field in TEXT_FIELDS:
+        if field in product and not isinstance(product[field], str):
+            problems.append(f"{field} is not a string ({type(product[field]).__name__})")
+
+    quantity = product.get('stock_quantity')
+    if quantity is not None and not _is_integer(quantity):
+        problems.append(f"stock_quantity is not an integer ({quantity!r})")
+    if product.get('stock_status', 'instock') not in STOCK_STATUSES:
+        problems.append(f"stock_status is not one of {', '.join(STOCK_STATUSES)} ({product['stock_status']!r})")
+    if product.get('tax_status', 'taxable') not in TAX_STATUSES:
+        problems.append(f"tax_status is not one of {', '.join(TAX_STATUSES)} ({product['tax_status']!r})")
+
+    if categories:
+        problems.extend(_check_categories(product.get('categories')))
+
+    images = product.get('images', [])
+    if not isinstance(images, list):
+        problems.append("images is not a list")
+    else:
+        problems.extend(problem for problem in (_check_image(n, image) for n, image in enumerate(images)) if problem)
+    return problems